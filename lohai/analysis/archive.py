@@ -0,0 +1,251 @@
+""" Append-only columnar archive of completed rounds
+
+An archive is a directory holding one file per column.  Every column stores
+a fixed number of bytes per round, mostly card codes (see
+lohai.game.deck.card_from_code) padded with NO_CARD:
+
+    deal        the 4 dealt hands of 9 cards
+    trump       the trump card
+    fields      the final field cards of each of the 9 tricks
+    leads       the lead suit of each trick, NO_SUIT if none was set
+    winners     the player awarded each trick, NO_PLAYER if unplayed
+    tricks_won  the trick count of each player at the end of the round
+    specials    per trick and player, a bitmask of the special cards played
+                (bit 0 shaker, 1 giver, 2 taker, 3 mover)
+    displaced   per trick, the field leader just before the last shaker
+                steal and before the last mover draw, NO_PLAYER if none
+
+ArchiveReader memory-maps the column files and hands out memoryviews shaped
+(rounds, width) without copying; numpy.asarray() turns one into an ndarray
+view of the same memory.
+"""
+import json
+import mmap
+import os
+
+from lohai.game.deck import CardValue, NO_CARD, encode_cards
+from lohai.game.round import HAND_SIZE, PLAYER_COUNT
+
+
+# bumped on every change of the columns: 2 added leads, 3 added displaced
+FORMAT_VERSION = 3
+
+NO_PLAYER = 0xff
+NO_SUIT = 0xff
+
+COLUMNS = (('deal', PLAYER_COUNT * HAND_SIZE),
+           ('trump', 1),
+           ('fields', HAND_SIZE * PLAYER_COUNT),
+           ('leads', HAND_SIZE),
+           ('winners', HAND_SIZE),
+           ('tricks_won', PLAYER_COUNT),
+           ('specials', HAND_SIZE * PLAYER_COUNT),
+           ('displaced', HAND_SIZE * 2))
+
+DISPLACED_VALUES = (CardValue.shaker, CardValue.mover)
+
+SPECIAL_BITS = {CardValue.shaker: 1,
+                CardValue.giver: 2,
+                CardValue.taker: 4,
+                CardValue.mover: 8}
+
+_META_FILE = 'meta.json'
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.u8')
+
+
+def encode_round(round):
+    """ Encode a Round as a dict of column name to fixed width bytes """
+    if round.player_count != PLAYER_COUNT:
+        raise ValueError("Only %d player rounds can be archived"
+                         % PLAYER_COUNT)
+    if len(round.trick_history) > HAND_SIZE:
+        raise ValueError("Round has more than %d tricks" % HAND_SIZE)
+
+    deal = bytearray()
+    for hand in round.dealt_hands:
+        deal.extend(encode_cards(hand, HAND_SIZE))
+
+    fields = bytearray()
+    leads = bytearray()
+    winners = bytearray()
+    specials = bytearray()
+    displaced = bytearray()
+    for trick in round.trick_history:
+        fields.extend(encode_cards(trick.field_cards))
+        leads.append(NO_SUIT if trick.lead_suit is None else trick.lead_suit)
+        winners.append(trick.winner)
+
+        played = bytearray(PLAYER_COUNT)
+        for card, player in trick.specials:
+            played[player] |= SPECIAL_BITS[card.value]
+        specials.extend(played)
+
+        leaders = dict(trick.displaced)
+        for value in DISPLACED_VALUES:
+            leader = leaders.get(value)
+            displaced.append(NO_PLAYER if leader is None else leader)
+
+    unplayed = HAND_SIZE - len(round.trick_history)
+    fields.extend([NO_CARD] * (unplayed * PLAYER_COUNT))
+    leads.extend([NO_SUIT] * unplayed)
+    winners.extend([NO_PLAYER] * unplayed)
+    specials.extend([0] * (unplayed * PLAYER_COUNT))
+    displaced.extend([NO_PLAYER] * (unplayed * len(DISPLACED_VALUES)))
+
+    return {'deal': deal,
+            'trump': encode_cards([round.trump_card]),
+            'fields': fields,
+            'leads': leads,
+            'winners': winners,
+            'tricks_won': bytearray(round.tricks_won),
+            'specials': specials,
+            'displaced': displaced}
+
+
+class ArchiveWriter(object):
+    """ Appends rounds to an archive, creating it if needed
+
+    Rounds are buffered and written to the column files by flush().
+    """
+    def __init__(self, path, buffer_rounds=1024):
+        self.path = path
+        self.buffer_rounds = buffer_rounds
+        self._buffers = dict((name, bytearray()) for name, _width in COLUMNS)
+        self._buffered = 0
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        meta_path = os.path.join(path, _META_FILE)
+        if os.path.exists(meta_path):
+            _check_meta(path)
+            self._truncate_torn_round()
+        else:
+            with open(meta_path, 'w') as meta:
+                json.dump({'version': FORMAT_VERSION,
+                           'columns': COLUMNS}, meta)
+
+    def _truncate_torn_round(self):
+        """ Cut every column back to the rounds that all columns hold
+
+        A crash part way through flush() leaves some columns a round ahead;
+        appending after them would misalign the columns.
+        """
+        rounds = _complete_rounds(self.path)
+        for name, width in COLUMNS:
+            column_path = _column_path(self.path, name)
+            if os.path.exists(column_path):
+                with open(column_path, 'r+b') as column:
+                    column.truncate(rounds * width)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, round):
+        for name, data in encode_round(round).items():
+            self._buffers[name].extend(data)
+
+        self._buffered += 1
+        if self._buffered >= self.buffer_rounds:
+            self.flush()
+
+    def flush(self):
+        for name, _width in COLUMNS:
+            buf = self._buffers[name]
+            with open(_column_path(self.path, name), 'ab') as column:
+                column.write(buf)
+            del buf[:]
+
+        self._buffered = 0
+
+    close = flush
+
+
+def _complete_rounds(path):
+    """ The number of rounds present in every column """
+    sizes = []
+    for name, width in COLUMNS:
+        column_path = _column_path(path, name)
+        if os.path.exists(column_path):
+            sizes.append(os.path.getsize(column_path) // width)
+        else:
+            sizes.append(0)
+    return min(sizes)
+
+
+def _check_meta(path):
+    with open(os.path.join(path, _META_FILE)) as meta:
+        meta = json.load(meta)
+
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError("%s is a version %s archive, expected version %d"
+                         % (path, meta['version'], FORMAT_VERSION))
+    if [tuple(column) for column in meta['columns']] != list(COLUMNS):
+        raise ValueError("%s has the columns of another version %d archive"
+                         % (path, FORMAT_VERSION))
+
+
+class ArchiveReader(object):
+    """ Memory-mapped, read only access to an archive
+
+    A partially written trailing round (e.g. after a crash mid-flush) is
+    ignored.  Views returned by column() must be released before close().
+    """
+    def __init__(self, path):
+        self.path = path
+        _check_meta(path)
+
+        self._files = {}
+        self._maps = {}
+        self.rounds = _complete_rounds(path)
+
+        if not self.rounds:
+            return
+
+        for name, width in COLUMNS:
+            column = open(_column_path(path, name), 'rb')
+            self._files[name] = column
+            self._maps[name] = mmap.mmap(column.fileno(), self.rounds * width,
+                                         access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.rounds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for column_map in self._maps.values():
+            column_map.close()
+        for column in self._files.values():
+            column.close()
+        self._maps = {}
+        self._files = {}
+
+    def column(self, name):
+        """ A zero copy (rounds, width) view of a column
+
+        An empty archive returns an empty one dimensional view.
+        """
+        width = dict(COLUMNS)[name]
+        if not self.rounds:
+            return memoryview(bytearray())
+        return memoryview(self._maps[name]).cast('B', [self.rounds, width])
+
+    def __getitem__(self, index):
+        """ The raw column bytes of a single round """
+        if not 0 <= index < self.rounds:
+            raise IndexError("Round %d is not in the archive" % index)
+
+        return dict((name, self._maps[name][index * width:
+                                            (index + 1) * width])
+                    for name, width in COLUMNS)
@@ -0,0 +1,319 @@
+""" Training data export of every decision made in self-play
+
+Each decision a policy makes (a card to play, a shaker victim, a mover
+source and destination, a giver victim) becomes one fixed size record of
+RECORD_SIZE bytes:
+
+    seat        the deciding player
+    kind        the index of the move action in MOVE_ACTIONS
+    trick       the number of completed tricks
+    trump       the trump card code
+    lead        the lead suit, NO_SUIT if none is set
+    hand        the player's hand, 9 card codes padded with NO_CARD
+    field       the field, 4 card codes
+    tricks_won  the tricks won by each player so far
+    legal       a bitmask over ACTION_COUNT actions of the legal moves
+    action      the action index of the move made
+    final       the player's tricks won at the end of the round
+    scoring     bit 0 set if the player took the Lo, bit 1 the Hai
+
+Card actions are indexed by CARD_CODES, followed by the four shaker
+victims, the twelve mover (source, dest) pairs and the four giver victims.
+
+DecisionRecorder wraps the policies of a round and keeps only the records
+of the round in play; the outcome fields are filled in when the round ends
+and the records are streamed to gzip compressed shard files.  Parallel
+self-play workers each write shards of their own.
+"""
+import glob
+import gzip
+import json
+import os
+import random
+
+from lohai.analysis.archive import NO_SUIT
+from lohai.game.deck import (CardValue, NO_CARD, Suit, card_from_code,
+                             encode_cards)
+from lohai.game.round import HAND_SIZE, MOVE_ACTIONS, PLAYER_COUNT
+from lohai.game.simulate import play_round, random_policy
+from lohai.parallel import run_chunks
+
+
+FORMAT_VERSION = 1
+
+CARD_CODES = tuple(sorted(
+    [suit << 4 | value for suit in Suit.all_suits()
+     for value in CardValue.number_values()]
+    + [Suit.none << 4 | value for value in CardValue.special_values()]))
+
+MOVER_PAIRS = tuple((source, dest) for source in range(PLAYER_COUNT)
+                    for dest in range(PLAYER_COUNT) if source != dest)
+
+_SHAKER_BASE = len(CARD_CODES)
+_MOVER_BASE = _SHAKER_BASE + PLAYER_COUNT
+_GIVER_BASE = _MOVER_BASE + len(MOVER_PAIRS)
+ACTION_COUNT = _GIVER_BASE + PLAYER_COUNT
+
+_ACTION_BY_CODE = dict((code, index) for index, code in enumerate(CARD_CODES))
+_MOVER_ACTIONS = dict((pair, _MOVER_BASE + index)
+                      for index, pair in enumerate(MOVER_PAIRS))
+
+_MASK_BYTES = (ACTION_COUNT + 7) // 8
+
+FIELDS = (('seat', 1),
+          ('kind', 1),
+          ('trick', 1),
+          ('trump', 1),
+          ('lead', 1),
+          ('hand', HAND_SIZE),
+          ('field', PLAYER_COUNT),
+          ('tricks_won', PLAYER_COUNT),
+          ('legal', _MASK_BYTES),
+          ('action', 1),
+          ('final', 1),
+          ('scoring', 1))
+
+
+def _field_offsets():
+    offsets = {}
+    offset = 0
+    for name, width in FIELDS:
+        offsets[name] = (offset, offset + width)
+        offset += width
+    return offsets, offset
+
+
+_OFFSETS, RECORD_SIZE = _field_offsets()
+
+_META_FILE = 'meta.json'
+
+
+def action_index(move):
+    """ The action index of a move in the Round.apply_moves format """
+    action = move[0]
+    if action == 'play_card':
+        return _ACTION_BY_CODE[move[2].code]
+    if action == 'handle_shaker':
+        return _SHAKER_BASE + move[2]
+    if action == 'handle_mover':
+        return _MOVER_ACTIONS[(move[2], move[3])]
+    if action == 'handle_giver':
+        return _GIVER_BASE + move[2]
+    raise ValueError("%r is not a move" % (move,))
+
+
+def encode_decision(round, player, moves, move):
+    """ The record of player choosing move out of moves, without outcome """
+    hand = round.current_hand
+    legal = 0
+    for legal_move in moves:
+        legal |= 1 << action_index(legal_move)
+
+    record = bytearray([player,
+                        MOVE_ACTIONS.index(move[0]),
+                        len(round.trick_history),
+                        round.trump_card.code,
+                        NO_SUIT if hand.lead_suit is None else hand.lead_suit])
+    record.extend(encode_cards(round.hands[player], HAND_SIZE))
+    record.extend(encode_cards(hand.field_cards))
+    record.extend(round.tricks_won)
+    record.extend(bytearray((legal >> (8 * index)) & 0xff
+                            for index in range(_MASK_BYTES)))
+    record.extend([action_index(move), 0, 0])
+    return record
+
+
+def decode_record(record):
+    """ The fields of a record as a dict, for inspection """
+    fields = dict((name, bytearray(record[start:end]))
+                  for name, (start, end) in _OFFSETS.items())
+    decoded = dict((name, value[0]) for name, value in fields.items()
+                   if len(value) == 1)
+    decoded['hand'] = [card_from_code(code) for code in fields['hand']
+                       if code != NO_CARD]
+    decoded['field'] = [card_from_code(code) for code in fields['field']]
+    decoded['tricks_won'] = list(fields['tricks_won'])
+    legal = sum(byte << (8 * index)
+                for index, byte in enumerate(fields['legal']))
+    decoded['legal'] = [index for index in range(ACTION_COUNT)
+                        if legal >> index & 1]
+    return decoded
+
+
+def _write_meta(path):
+    meta_path = os.path.join(path, _META_FILE)
+    if os.path.exists(meta_path):
+        _check_meta(path)
+        return
+
+    # workers may race to create it, the content is always the same
+    temp_path = '%s.%d' % (meta_path, os.getpid())
+    with open(temp_path, 'w') as meta:
+        json.dump({'version': FORMAT_VERSION,
+                   'record_size': RECORD_SIZE,
+                   'fields': FIELDS}, meta)
+    os.rename(temp_path, meta_path)
+
+
+def _check_meta(path):
+    with open(os.path.join(path, _META_FILE)) as meta:
+        meta = json.load(meta)
+
+    if (meta['version'] != FORMAT_VERSION
+            or [tuple(field) for field in meta['fields']] != list(FIELDS)):
+        raise ValueError("%s is not a version %d export"
+                         % (path, FORMAT_VERSION))
+
+
+class ShardWriter(object):
+    """ Writes records to gzip shards of at most records_per_shard records
+
+    Shards are named <name>-<number>.gz, so writers with different names
+    can share a directory.
+    """
+    def __init__(self, path, name, records_per_shard=1 << 16,
+                 compresslevel=6):
+        self.path = path
+        self.name = name
+        self.records_per_shard = records_per_shard
+        self.compresslevel = compresslevel
+        self.shards = 0
+        self.records = 0
+        self._file = None
+        self._in_shard = 0
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        _write_meta(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, records):
+        """ Append a buffer of whole records """
+        records = memoryview(records)
+        if len(records) % RECORD_SIZE:
+            raise ValueError("%d bytes are not whole records" % len(records))
+
+        while len(records):
+            if self._file is None:
+                self._file = gzip.open(
+                    os.path.join(self.path, '%s-%05d.gz' % (self.name,
+                                                            self.shards)),
+                    'wb', self.compresslevel)
+                self.shards += 1
+
+            count = min(len(records) // RECORD_SIZE,
+                        self.records_per_shard - self._in_shard)
+            self._file.write(records[:count * RECORD_SIZE])
+            records = records[count * RECORD_SIZE:]
+            self._in_shard += count
+            self.records += count
+
+            if self._in_shard == self.records_per_shard:
+                self._close_shard()
+
+    def _close_shard(self):
+        self._file.close()
+        self._file = None
+        self._in_shard = 0
+
+    def close(self):
+        if self._file is not None:
+            self._close_shard()
+
+
+def shard_paths(path):
+    _check_meta(path)
+    return sorted(glob.glob(os.path.join(path, '*.gz')))
+
+
+def read_shard(shard_path):
+    """ The records of a shard as one bytes object, RECORD_SIZE apiece
+
+    numpy.frombuffer(data, 'u1').reshape(-1, RECORD_SIZE) gives an array.
+    """
+    with gzip.open(shard_path, 'rb') as shard:
+        return shard.read()
+
+
+def iter_records(path):
+    for shard_path in shard_paths(path):
+        data = read_shard(shard_path)
+        for start in range(0, len(data), RECORD_SIZE):
+            yield data[start:start + RECORD_SIZE]
+
+
+class DecisionRecorder(object):
+    """ Records the decisions of rounds played with wrapped policies
+
+    Only the records of the round in play are held, as bytes; finish_round()
+    fills in their outcome and hands them to the writer.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self._pending = bytearray()
+
+    def wrap(self, policy):
+        def recording_policy(round, player, moves, rng):
+            move = policy(round, player, moves, rng)
+            self._pending.extend(encode_decision(round, player, moves, move))
+            return move
+        return recording_policy
+
+    def finish_round(self, round):
+        lo, hai = round.lo_hai()
+        final_start = _OFFSETS['final'][0]
+        scoring_start = _OFFSETS['scoring'][0]
+        for start in range(0, len(self._pending), RECORD_SIZE):
+            player = self._pending[start]
+            self._pending[start + final_start] = round.tricks_won[player]
+            self._pending[start + scoring_start] = (
+                (1 if player == lo else 0) | (2 if player == hai else 0))
+
+        self.writer.write(self._pending)
+        self._pending = bytearray()
+
+    def play_round(self, policies, rng):
+        round = play_round([self.wrap(policy) for policy in policies], rng)
+        self.finish_round(round)
+        return round
+
+
+def export_rounds(path, name, seed, rounds, policies=None,
+                  records_per_shard=1 << 16):
+    """ Play seeded rounds, writing their decisions to shards called name
+
+    Returns the number of records written.
+    """
+    policies = policies or [random_policy] * PLAYER_COUNT
+    rng = random.Random(seed)
+    with ShardWriter(path, name, records_per_shard) as writer:
+        recorder = DecisionRecorder(writer)
+        for _i in range(rounds):
+            recorder.play_round(policies, rng)
+    return writer.records
+
+
+def export_self_play(path, rounds, chunk_rounds=1000, processes=None, seed=0,
+                     records_per_shard=1 << 16):
+    """ Export the decisions of rounds of self-play across a process pool
+
+    Each chunk of rounds is played and written by one worker, to shards of
+    its own.  Returns the number of records written.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    _write_meta(path)
+
+    records = []
+    run_chunks(export_rounds,
+               ((path, 'chunk-%s-%08d' % (seed, start),
+                 '%s:%s' % (seed, start), min(chunk_rounds, rounds - start),
+                 None, records_per_shard)
+                for start in range(0, rounds, chunk_rounds)),
+               records.append, processes)
+    return sum(records)
@@ -0,0 +1,214 @@
+""" Streaming statistics over simulated and archived rounds
+
+RoundStats aggregates completed rounds as they are produced.  Partial
+results are plain counters that merge(), so each worker process keeps its
+own RoundStats and only the totals travel back to the parent.
+
+A seat wins a round when it scores either the Lo or the Hai.  A taker or
+giver changed a trick's outcome when the trick was awarded to someone other
+than the player of the highest card on its final field.  A shaker or mover
+changed it when the trick was awarded to someone other than the leader of
+the field just before the steal or the replacement draw (see
+lohai.game.round.Trick).
+
+Game events carry no payload beyond their type, so the aggregator is fed the
+trick records of each completed round rather than subscribing to
+lohai.events.
+"""
+import math
+import random
+
+from lohai.analysis.archive import (DISPLACED_VALUES, NO_PLAYER, NO_SUIT,
+                                    SPECIAL_BITS)
+from lohai.game.deck import CardValue, Suit, card_from_code, decode_cards
+from lohai.game.round import PLAYER_COUNT, highest_card_player, lo_hai
+from lohai.game.simulate import play_round, random_policy
+from lohai.parallel import run_chunks
+
+
+class Proportion(object):
+    """ A count of successes out of trials """
+    def __init__(self, successes=0, trials=0):
+        self.successes = successes
+        self.trials = trials
+
+    def add(self, success):
+        self.trials += 1
+        if success:
+            self.successes += 1
+
+    def merge(self, other):
+        self.successes += other.successes
+        self.trials += other.trials
+
+    @property
+    def rate(self):
+        return float(self.successes) / self.trials if self.trials else None
+
+    def interval(self, z=1.96):
+        """ The Wilson score interval, (0, 1) before any trials """
+        if not self.trials:
+            return 0.0, 1.0
+
+        n = float(self.trials)
+        p = self.successes / n
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        spread = (z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+                  / (1 + z * z / n))
+        return center - spread, center + spread
+
+    def half_width(self, z=1.96):
+        low, high = self.interval(z)
+        return (high - low) / 2
+
+    def __eq__(self, other):
+        return (self.successes, self.trials) == (other.successes,
+                                                 other.trials)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Proportion(%d, %d)' % (self.successes, self.trials)
+
+
+def _seat_proportions():
+    return [Proportion() for _i in range(PLAYER_COUNT)]
+
+
+class RoundStats(object):
+    """ Mergeable statistics over completed rounds
+
+        - by_trump_suit/by_trump_value: per seat win Proportions, keyed by
+          the trump card's Suit and CardValue
+        - specials: per special CardValue, the Proportion of tricks it was
+          played in that it changed the outcome of
+        - tricks_won: how many times a player ended a round with each trick
+          count
+    """
+    def __init__(self):
+        self.rounds = 0
+        self.by_trump_suit = {}
+        self.by_trump_value = {}
+        self.specials = dict((value, Proportion())
+                             for value in CardValue.special_values())
+        self.tricks_won = {}
+
+    def _observe(self, trump_card, tricks, tricks_won):
+        """ tricks are (field_cards, lead_suit, winner, special values,
+        {shaker or mover value: leader before the action})
+        """
+        self.rounds += 1
+
+        scoring = lo_hai(tricks_won)
+        suit_seats = self.by_trump_suit.setdefault(trump_card.suit,
+                                                   _seat_proportions())
+        value_seats = self.by_trump_value.setdefault(trump_card.value,
+                                                     _seat_proportions())
+        for seat in range(PLAYER_COUNT):
+            suit_seats[seat].add(seat in scoring)
+            value_seats[seat].add(seat in scoring)
+
+        for count in tricks_won:
+            self.tricks_won[count] = self.tricks_won.get(count, 0) + 1
+
+        for field_cards, lead_suit, winner, special_values, displaced in tricks:
+            for value in (CardValue.taker, CardValue.giver):
+                if value in special_values:
+                    self.specials[value].add(winner != highest_card_player(
+                        field_cards, trump_card.suit, lead_suit))
+
+            for value, leader in displaced.items():
+                if leader is not None:
+                    self.specials[value].add(winner != leader)
+
+    def observe_round(self, round):
+        tricks = ((trick.field_cards, trick.lead_suit, trick.winner,
+                   set(card.value for card, _player in trick.specials),
+                   dict(trick.displaced))
+                  for trick in round.trick_history)
+        self._observe(round.trump_card, tricks, round.tricks_won)
+
+    def observe_archive(self, reader):
+        """ Add every round of an ArchiveReader """
+        for index in range(len(reader)):
+            row = reader[index]
+            self._observe(card_from_code(bytearray(row['trump'])[0]),
+                          _archived_tricks(row), list(bytearray(
+                              row['tricks_won'])))
+
+    def merge(self, other):
+        self.rounds += other.rounds
+        for mine, theirs in ((self.by_trump_suit, other.by_trump_suit),
+                             (self.by_trump_value, other.by_trump_value)):
+            for key, seats in theirs.items():
+                for seat, proportion in zip(
+                        mine.setdefault(key, _seat_proportions()), seats):
+                    seat.merge(proportion)
+
+        for value, proportion in other.specials.items():
+            self.specials[value].merge(proportion)
+
+        for count, occurrences in other.tricks_won.items():
+            self.tricks_won[count] = (self.tricks_won.get(count, 0)
+                                      + occurrences)
+
+    def converged(self, half_width, z=1.96):
+        """ Every per trump suit win rate is known to within half_width """
+        seats = [proportion for proportions in self.by_trump_suit.values()
+                 for proportion in proportions]
+        return bool(seats) and all(proportion.half_width(z) <= half_width
+                                   for proportion in seats)
+
+
+def _archived_tricks(row):
+    fields = decode_cards(row['fields'])
+    leads = bytearray(row['leads'])
+    specials = bytearray(row['specials'])
+    displaced = bytearray(row['displaced'])
+    for index, winner in enumerate(bytearray(row['winners'])):
+        if winner == NO_PLAYER:
+            continue
+
+        seats = slice(index * PLAYER_COUNT, (index + 1) * PLAYER_COUNT)
+        used = 0
+        for bits in specials[seats]:
+            used |= bits
+        lead_suit = None if leads[index] == NO_SUIT else Suit(leads[index])
+        leaders = displaced[index * len(DISPLACED_VALUES):
+                            (index + 1) * len(DISPLACED_VALUES)]
+        yield (fields[seats], lead_suit, winner,
+               set(value for value, bit in SPECIAL_BITS.items() if used & bit),
+               dict((value, None if leader == NO_PLAYER else leader)
+                    for value, leader in zip(DISPLACED_VALUES, leaders)))
+
+
+def simulate_rounds(seed, rounds, policies=None):
+    """ Play seeded rounds and return their RoundStats """
+    policies = policies or [random_policy] * PLAYER_COUNT
+    rng = random.Random(seed)
+    stats = RoundStats()
+    for _i in range(rounds):
+        stats.observe_round(play_round(policies, rng))
+    return stats
+
+
+def parallel_stats(half_width, max_rounds, chunk_rounds=500, processes=None,
+                   seed=0, z=1.96):
+    """ Simulate rounds across a process pool until the stats converge
+
+    Each worker returns the merged stats of a chunk of rounds.  Stops once
+    every trump suit win rate is within half_width, or after max_rounds.
+    """
+    stats = RoundStats()
+
+    def merge(chunk):
+        stats.merge(chunk)
+        return stats.converged(half_width, z)
+
+    run_chunks(simulate_rounds,
+               (('%s:%s' % (seed, start),
+                 min(chunk_rounds, max_rounds - start))
+                for start in range(0, max_rounds, chunk_rounds)),
+               merge, processes)
+    return stats
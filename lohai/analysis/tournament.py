@@ -0,0 +1,134 @@
+""" Duplicate format matches between two policies
+
+Every deal is played once per seating, with the same shuffled cards each
+time, so both policies play every hand of the deal and the luck of the deal
+cancels out of the comparison.  Deals are played across a process pool until
+the difference in win rates is significant.
+
+Policies are as in lohai.game.simulate and must be picklable, i.e. module
+level functions.  A seat wins a round when it scores the Lo or the Hai.
+"""
+import math
+import random
+
+from lohai.game.round import Round
+from lohai.game.simulate import play_round
+from lohai.parallel import run_chunks
+
+
+# policy index per seat, each policy plays every hand exactly once
+SEATINGS = ((0, 1, 0, 1),
+            (1, 0, 1, 0))
+
+
+# floor for the variance of the per deal differences: identical deals say
+# little about the spread, and must not make the difference look certain
+MIN_VARIANCE = 1.0 / 64
+
+
+class MatchResult(object):
+    """ Mergeable results of a match between policies 0 and 1
+
+    Alongside the win counts this keeps the per deal differences in win rate,
+    which the significance test is based on.
+    """
+    def __init__(self):
+        self.deals = 0
+        self.wins = [0, 0]
+        self.seat_games = [0, 0]
+        self._difference_sum = 0.0
+        self._difference_squares = 0.0
+
+    def add_deal(self, wins, seat_games):
+        self.deals += 1
+        for policy in (0, 1):
+            self.wins[policy] += wins[policy]
+            self.seat_games[policy] += seat_games[policy]
+
+        difference = (float(wins[0]) / seat_games[0]
+                      - float(wins[1]) / seat_games[1])
+        self._difference_sum += difference
+        self._difference_squares += difference * difference
+
+    def merge(self, other):
+        self.deals += other.deals
+        for policy in (0, 1):
+            self.wins[policy] += other.wins[policy]
+            self.seat_games[policy] += other.seat_games[policy]
+        self._difference_sum += other._difference_sum
+        self._difference_squares += other._difference_squares
+
+    def win_rate(self, policy):
+        if not self.seat_games[policy]:
+            return None
+        return float(self.wins[policy]) / self.seat_games[policy]
+
+    @property
+    def mean_difference(self):
+        """ Policy 0's win rate minus policy 1's, averaged over deals """
+        return self._difference_sum / self.deals if self.deals else 0.0
+
+    def z_score(self):
+        """ The paired z statistic of the win rate difference """
+        if self.deals < 2:
+            return 0.0
+
+        mean = self.mean_difference
+        variance = ((self._difference_squares - self.deals * mean * mean)
+                    / (self.deals - 1))
+        variance = max(variance, MIN_VARIANCE)
+        return mean / math.sqrt(variance / self.deals)
+
+    def significant(self, z=3.0, min_deals=30):
+        return self.deals >= min_deals and abs(self.z_score()) >= z
+
+
+def play_deal(seed, policies):
+    """ Play one deal under every seating
+
+    Returns ([wins per policy], [seats played per policy]).
+    """
+    wins = [0, 0]
+    seat_games = [0, 0]
+    for seating_index, seating in enumerate(SEATINGS):
+        round = Round.start_new_round(random.Random(seed))
+        rng = random.Random('%s:%s' % (seed, seating_index))
+        play_round([policies[policy] for policy in seating], rng, round)
+
+        scoring = round.lo_hai()
+        for seat, policy in enumerate(seating):
+            seat_games[policy] += 1
+            if seat in scoring:
+                wins[policy] += 1
+
+    return wins, seat_games
+
+
+def play_deals(seeds, policies):
+    result = MatchResult()
+    for seed in seeds:
+        result.add_deal(*play_deal(seed, policies))
+    return result
+
+
+def run_match(policies, max_deals, chunk_deals=100, processes=None, seed=0,
+              z=3.0, min_deals=30):
+    """ Play deals across a process pool until one policy is better
+
+    Stops as soon as the merged results are significant at z, or after
+    max_deals.  The threshold is deliberately strict as the test is repeated
+    after every chunk.
+    """
+    result = MatchResult()
+
+    def merge(chunk):
+        result.merge(chunk)
+        return result.significant(z, min_deals)
+
+    run_chunks(play_deals,
+               ((['%s:%s' % (seed, deal)
+                  for deal in range(start, min(start + chunk_deals,
+                                               max_deals))], policies)
+                for start in range(0, max_deals, chunk_deals)),
+               merge, processes)
+    return result
@@ -1,8 +1,27 @@
+""" Game event notification
+
+Callbacks subscribed with subscribe() are held by weak reference, so
+subscribing never keeps their owner alive: a spectator or bot session that
+goes away simply stops being notified.  Bound methods are held through their
+instance.  Callables that can't be referenced weakly, such as builtin
+methods like list.append, are held strongly until unsubscribed.
+add_handler() always holds its handler strongly.
+
+Every Events member has its own Event, and a callback subscribed to several
+types is added to each of their callback lists when it subscribes, so a
+notification only walks the callbacks of its own type.
+
+Notifications are logged at debug level once the application has imported
+logging; until then nothing can be listening, and importing it here would
+dominate the start up time of game workers.
+"""
 import enum
-import logging
+import sys
+import types
+import weakref
 
 
-logger = logging.getLogger(__name__)
+_logger = None
 
 
 @enum.unique  # pylint: disable=W0232
@@ -14,7 +33,138 @@ class Events(enum.Enum):
     hand_complete = 2000
 
 
+def _strong_ref(callback):
+    return lambda: callback
+
+
+def _ref(callback, on_dead):
+    if isinstance(callback, types.MethodType):
+        return weakref.WeakMethod(callback, on_dead)
+    # a builtin method object is made afresh on each attribute access and
+    # would die at once, whatever the lifetime of its instance
+    if isinstance(callback, types.BuiltinMethodType):
+        return _strong_ref(callback)
+    try:
+        return weakref.ref(callback, on_dead)
+    except TypeError:
+        return _strong_ref(callback)
+
+
+class Event(object):
+    """ A named event with weakly held callbacks
+
+    callbacks holds the weak references of the live callbacks; a reference
+    is dropped as soon as its callback is garbage collected.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.callbacks = []
+
+    def _drop(self, ref):
+        try:
+            self.callbacks.remove(ref)
+        except ValueError:
+            pass
+
+    def register(self, callback):
+        self.callbacks.append(_ref(callback, self._drop))
+
+    def unregister(self, callback):
+        """ Remove callback, returns False if it wasn't registered """
+        for ref in self.callbacks:
+            if ref() == callback:
+                self.callbacks.remove(ref)
+                return True
+        return False
+
+    def notify(self, *args):
+        # callbacks may unregister, or be collected, part way through
+        for ref in tuple(self.callbacks):
+            callback = ref()
+            if callback is not None:
+                callback(*args)
+
+    def __repr__(self):
+        return 'Event(%r)' % (self.name,)
+
+
+_events = dict((event_type, Event(event_type.name)) for event_type in Events)
+
+
+def subscribe(callback, event_types=None):
+    """ Call callback(game_id, player_id, event_type) for each of event_types
+
+    Subscribes to every type if event_types is None.  The callback is held
+    weakly, keep a reference to it for as long as it should be called.
+    """
+    for event_type in event_types or Events:
+        _events[event_type].register(callback)
+
+
+def unsubscribe(callback, event_types=None):
+    """ Stop calling callback for event_types, by default for every type """
+    for event_type in event_types or Events:
+        _events[event_type].unregister(callback)
+
+
+class Subscriptions(object):
+    """ A set of (callback, event_types) subscriptions made and dropped
+    together, e.g. everything a spectator or bot session listens to
+
+    The subscriptions hold their callbacks strongly, so they stay
+    subscribed until close() or until the Subscriptions is collected.
+    """
+    def __init__(self, subscriptions=()):
+        self._subscriptions = []
+        for callback, event_types in subscriptions:
+            self.add(callback, event_types)
+
+    def add(self, callback, event_types=None):
+        event_types = tuple(event_types or Events)
+        subscribe(callback, event_types)
+        self._subscriptions.append((callback, event_types))
+
+    def close(self):
+        for callback, event_types in self._subscriptions:
+            unsubscribe(callback, event_types)
+        self._subscriptions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_handlers = []
+
+
+def add_handler(handler):
+    """ Call handler(game_id, player_id, event_type) for every notification
+
+    The handler is held strongly until remove_handler().
+    """
+    subscribe(handler)
+    _handlers.append(handler)
+
+
+def remove_handler(handler):
+    unsubscribe(handler)
+    if handler in _handlers:
+        _handlers.remove(handler)
+
+
+def _debug(message, *args):
+    global _logger  # pylint: disable=W0603
+    if _logger is None:
+        logging = sys.modules.get('logging')
+        if logging is None:
+            return
+        _logger = logging.getLogger(__name__)
+    _logger.debug(message, *args)
+
+
 def event_notify(game_id, player_id, event_type):
-    """ Notification stub """
-    logger.debug("Notification for Game %s, Player %s, Event %s",
-                 game_id, player_id, event_type)
+    _debug("Notification for Game %s, Player %s, Event %s",
+           game_id, player_id, event_type)
+    _events[event_type].notify(game_id, player_id, event_type)
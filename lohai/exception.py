@@ -18,3 +18,16 @@ class NotYourTurn(Exception):
 
 class InvalidMove(Exception):
     pass
+
+
+class IllegalMove(InvalidMove):
+    """ A move in a batch could not be applied """
+    def __init__(self, index, move, reason):
+        super(IllegalMove, self).__init__(
+            "Move %d %r is illegal: %s" % (index, move, reason))
+        self.index = index
+        self.move = move
+        self.reason = reason
+
+    def __reduce__(self):
+        return (IllegalMove, (self.index, self.move, self.reason))
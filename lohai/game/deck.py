@@ -1,6 +1,6 @@
 import enum
 from functools import total_ordering
-from itertools import product, starmap
+from itertools import product
 import random
 
 
@@ -22,7 +22,7 @@ class Suit(enum.IntEnum):
 
     @classmethod
     def all_suits(cls):
-        return cls.red_suits() + cls.black_suits()
+        return list(_ALL_SUITS)
 
 
 @enum.unique  # pylint: disable=W0232
@@ -45,16 +45,33 @@ class CardValue(enum.IntEnum):
 
     @classmethod
     def number_values(cls):
-        return [cls.two, cls.three, cls.four, cls.five, cls.six, cls.seven,
-                cls.eight, cls.nine, cls.jack, cls.queen, cls.king]
+        return list(_NUMBER_VALUES)
 
     @classmethod
     def special_values(cls):
-        return [cls.taker, cls.giver, cls.mover, cls.shaker]
+        return list(_SPECIAL_VALUES)
+
+
+# built once and shared, the classmethods above return copies
+_ALL_SUITS = (Suit.heart, Suit.diamond, Suit.spade, Suit.club)
+
+_NUMBER_VALUES = (CardValue.two, CardValue.three, CardValue.four,
+                  CardValue.five, CardValue.six, CardValue.seven,
+                  CardValue.eight, CardValue.nine, CardValue.jack,
+                  CardValue.queen, CardValue.king)
+
+_SPECIAL_VALUES = (CardValue.taker, CardValue.giver, CardValue.mover,
+                   CardValue.shaker)
 
 
 @total_ordering
 class Card(object):
+    """ A playing card
+
+    Cards are immutable.  The deck is built from one shared instance per card
+    (see card_from_code), and pickled cards are restored to those instances.
+    """
+    __slots__ = ['_value', '_suit']
     is_special = False
 
     def __init__(self, value, suit):
@@ -78,11 +95,14 @@ class Card(object):
         else:
             return self.suit < other.suit
 
-    def __getstate__(self):
-        return {'_value': self._value,
-                '_suit': self._suit}
+    def __hash__(self):
+        return self.code
+
+    def __reduce__(self):
+        return (card_from_code, (self.code,))
 
     def __setstate__(self, state):
+        # cards pickled before Card had __slots__ carry a state dict
         self._value = state['_value']
         self._suit = state['_suit']
 
@@ -98,56 +118,121 @@ class Card(object):
     def suit(self):
         return self._suit
 
-    def __str__(self):
-        suit_str = {Suit.spade: 'Spades',
-                    Suit.heart: 'Hearts',
-                    Suit.club: 'Clubs',
-                    Suit.diamond: 'Diamonds'}.get(self.suit)
-        value_str = {CardValue.jack: 'Jack',
-                     CardValue.queen: 'Queen',
-                     CardValue.king: 'King'}.get(self.value, self.value)
+    @property
+    def code(self):
+        """ A one byte integer encoding of the card, see card_from_code """
+        return self._suit << 4 | self._value
 
-        return "%s of %s" % (value_str, suit_str)
+    def __str__(self):
+        return "%s of %s" % (_VALUE_NAMES.get(self.value, self.value),
+                             _SUIT_NAMES.get(self.suit))
 
     def __repr__(self):
         return 'Card(%s, %s)' % (self.value.name, self.suit.name)
 
 
 class SpecialCard(Card):
-    __slots__ = ['_value', '_suit']
+    __slots__ = []
     is_special = True
 
     def __init__(self, value, suit=Suit.none):
         if suit != Suit.none:
             raise Exception("Special cards have no suit")
 
-        if value not in CardValue.special_values():
+        if value not in _SPECIAL_VALUES:
             raise Exception("%s is not a special value" % value)
 
         super(SpecialCard, self).__init__(value, suit)
 
     def __str__(self):
-        return {CardValue.taker: 'Taker',
-                CardValue.mover: 'Mover',
-                CardValue.giver: 'Giver',
-                CardValue.shaker: 'Shaker'}[self.value]
+        return _SPECIAL_NAMES[self.value]
+
+
+_SUIT_NAMES = {Suit.spade: 'Spades',
+               Suit.heart: 'Hearts',
+               Suit.club: 'Clubs',
+               Suit.diamond: 'Diamonds'}
+
+_VALUE_NAMES = {CardValue.jack: 'Jack',
+                CardValue.queen: 'Queen',
+                CardValue.king: 'King'}
+
+_SPECIAL_NAMES = {CardValue.taker: 'Taker',
+                  CardValue.mover: 'Mover',
+                  CardValue.giver: 'Giver',
+                  CardValue.shaker: 'Shaker'}
+
+
+NO_CARD = 0xff
+
+
+def _build_cards_by_code():
+    cards = [None] * 256
+    for value, suit in product(_NUMBER_VALUES, _ALL_SUITS):
+        cards[suit << 4 | value] = Card(value, suit)
+    for value in _SPECIAL_VALUES:
+        cards[Suit.none << 4 | value] = SpecialCard(value)
+    return cards
+
+
+_CARDS_BY_CODE = _build_cards_by_code()
+
+# the unshuffled deck, two of each kind of special card
+_NEW_DECK = tuple(
+    [_CARDS_BY_CODE[suit << 4 | value]
+     for value, suit in product(_NUMBER_VALUES, _ALL_SUITS)]
+    + [_CARDS_BY_CODE[Suit.none << 4 | value]
+       for value in _SPECIAL_VALUES for _copy in range(2)])
+
+DECK_SIZE = len(_NEW_DECK)
+
+
+def card_from_code(code):
+    """ The card for a Card.code, or None for NO_CARD """
+    if code == NO_CARD:
+        return None
+
+    card = _CARDS_BY_CODE[code]
+    if card is None:
+        raise ValueError("%s is not a valid card code" % code)
+    return card
+
+
+def encode_cards(cards, width=None):
+    """ Encode cards (or None) as a bytearray of card codes
+
+    If width is given the result is padded with NO_CARD to that length.
+    """
+    codes = bytearray(NO_CARD if card is None else card.code
+                      for card in cards)
+    if width is not None:
+        if len(codes) > width:
+            raise ValueError("%d cards do not fit in %d" % (len(codes), width))
+        codes.extend([NO_CARD] * (width - len(codes)))
+    return codes
+
+
+def decode_cards(codes):
+    """ The inverse of encode_cards, NO_CARD padding decodes to None """
+    return [card_from_code(code) for code in bytearray(codes)]
 
 
 class Deck(object):
+    __slots__ = ['cards']
+
     def __init__(self, cards):
         self.cards = cards
 
-    @staticmethod
-    def shuffle_new_deck():
-        cards = list(starmap(Card, product(CardValue.number_values(),
-                                           Suit.all_suits())))
+    def __getstate__(self):
+        return {'cards': self.cards}
 
-        for special_value in CardValue.special_values():
-            # two of each kind of special card
-            cards.append(SpecialCard(special_value))
-            cards.append(SpecialCard(special_value))
+    def __setstate__(self, state):
+        self.cards = state['cards']
 
-        random.shuffle(cards)
+    @staticmethod
+    def shuffle_new_deck(rng=None):
+        cards = list(_NEW_DECK)
+        (rng or random).shuffle(cards)
         return Deck(cards)
 
     def draw_card(self):
@@ -0,0 +1,132 @@
+""" Exact odds of the replacement draws of shakers and movers
+
+A shaker or mover that is used, or can't be, is replaced on the field by the
+top card of the deck.  To a player every card they haven't seen is equally
+likely to be that card, whether it is in an opponent's hand or the deck: the
+unseen cards are the full deck less their own hand, the trump card, the
+cards on the field and in completed tricks and the shakers and movers
+discarded along the way.
+
+DrawKnowledge follows one player's view of a round.  The unseen cards of
+completed tricks are settled once, as each trick completes, and only the
+current trick is looked at again; trick outcomes are cached until the field
+changes.
+"""
+from collections import Counter
+
+from lohai.game.deck import CardValue, Deck, card_from_code
+from lohai.game.round import field_leader
+
+
+_FULL_DECK = Counter(card.code for card in Deck.shuffle_new_deck().cards)
+
+_DRAWN_VALUES = (CardValue.shaker, CardValue.mover)
+
+
+def _discarded(specials, field_cards):
+    """ The codes of the shakers and movers replaced on the field """
+    discarded = Counter(card.code for card, _player in specials
+                        if card.value in _DRAWN_VALUES)
+    discarded.subtract(card.code for card in field_cards
+                       if card is not None and card.value in _DRAWN_VALUES)
+    return +discarded
+
+
+class DrawKnowledge(object):
+    """ The next draw as seen by player """
+    def __init__(self, round, player):
+        self.round = round
+        self.player = player
+
+        self._settled = Counter(_FULL_DECK)
+        self._settled[round.trump_card.code] -= 1
+        self._settled_tricks = 0
+        self._outcomes = {}
+
+    def _settle(self):
+        """ Remove the cards of newly completed tricks from the unseen """
+        history = self.round.trick_history
+        if self._settled_tricks == len(history):
+            return
+
+        for trick in history[self._settled_tricks:]:
+            self._settled.subtract(card.code for card in trick.field_cards)
+            self._settled.subtract(_discarded(trick.specials, ()))
+        self._settled_tricks = len(history)
+        self._outcomes = {}
+
+    def unseen(self):
+        """ A Counter of the card codes player hasn't seen """
+        self._settle()
+        hand = self.round.current_hand
+
+        unseen = Counter(self._settled)
+        unseen.subtract(card.code for card in self.round.hands[self.player])
+        unseen.subtract(card.code for card in hand.field_cards
+                        if card is not None)
+        unseen.subtract(_discarded(hand.specials, hand.field_cards))
+        return +unseen
+
+    def draw_distribution(self):
+        """ The probability of each Card being the next card drawn """
+        unseen = self.unseen()
+        total = float(sum(unseen.values()))
+        return dict((card_from_code(code), count / total)
+                    for code, count in unseen.items())
+
+    def _trick_controller(self, field_cards, seat, card):
+        """ Who takes or gives the trick once card is placed at seat, None
+        if the card is another shaker or mover to be replaced
+        """
+        if card.value in _DRAWN_VALUES:
+            return None
+        if card.value in (CardValue.taker, CardValue.giver):
+            return seat
+
+        hand = self.round.current_hand
+        if hand.most_recent_giver_taker is not None:
+            return hand.most_recent_giver_taker.player
+
+        lead_suit = hand.lead_suit
+        if lead_suit is None and not card.is_special:
+            lead_suit = card.suit
+
+        field = list(field_cards)
+        field[seat] = card
+        return field_leader(field, self.round.trump_suit, lead_suit)
+
+    def _outcomes_for(self, field_cards, seat):
+        hand = self.round.current_hand
+        self._settle()
+        key = (tuple(None if card is None else card.code
+                     for card in field_cards), seat, hand.lead_suit,
+               hand.most_recent_giver_taker, len(hand.specials),
+               len(self.round.hands[self.player]))
+        outcomes = self._outcomes.get(key)
+        if outcomes is None:
+            outcomes = {}
+            for card, chance in self.draw_distribution().items():
+                controller = self._trick_controller(field_cards, seat, card)
+                outcomes[controller] = outcomes.get(controller, 0) + chance
+            self._outcomes[key] = outcomes
+        return outcomes
+
+    def mover_outcomes(self, mover):
+        """ The chance of each player controlling the trick once mover's
+        card is replaced by the next draw
+
+        A player controls the trick if they lead it or hold its most recent
+        giver or taker; None stands for drawing another shaker or mover.
+        """
+        return self._outcomes_for(self.round.current_hand.field_cards, mover)
+
+    def shaker_outcomes(self, shaker, victim):
+        """ As mover_outcomes, for shaker stealing victim's card and victim
+        drawing the replacement
+        """
+        field = list(self.round.current_hand.field_cards)
+        if field[victim] is None:
+            raise ValueError("Player %d has no card to steal" % victim)
+        field[shaker] = field[victim]
+        field[victim] = None
+        return self._outcomes_for(field, victim)
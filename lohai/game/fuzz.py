@@ -0,0 +1,254 @@
+""" Random legal games checked against the rules' invariants
+
+    python -m lohai.game.fuzz --games 1000000
+
+Each game is dealt from its seed and played by picking uniformly among the
+legal moves.  After every move the round is checked for:
+
+    - card conservation: the hands, the deck, the trump card, the field, the
+      completed tricks and the discarded shakers and movers are exactly one
+      full deck
+    - trick totals: the tricks won add up to the completed tricks
+    - turn order: while cards are being played the filled seats run from the
+      trick's first player up to the current player
+    - hand state: the Hand's state matches what is on the field
+
+and any exception raised by the engine is a failure too.  Games are played
+across a process pool.  A failing game is shrunk for the same seed, which
+deals its cards: choices are deleted, and the rest replaced by the first
+legal move, wherever the game still fails, until neither helps.  Replay
+stops at the failing move, so the result also ends there.  This finds a
+locally simplest sequence, not necessarily the shortest one.
+"""
+import argparse
+from collections import Counter, namedtuple
+import random
+
+from lohai.game.deck import CardValue, Deck
+from lohai.game.notation import format_moves
+from lohai.game.round import HandState, Round
+from lohai.game.simulate import legal_moves
+from lohai.parallel import run_chunks
+
+
+# choices are indices into legal_moves at each step, moves in notation
+Failure = namedtuple('Failure',  # pylint: disable=C0103
+                     ['seed', 'choices', 'moves', 'error'])
+
+
+class InvariantError(AssertionError):
+    pass
+
+
+_FULL_DECK = Counter(Deck.shuffle_new_deck().cards)
+
+_DRAWN_VALUES = (CardValue.shaker, CardValue.mover)
+
+
+def _check_cards(round):
+    hand = round.current_hand
+    cards = Counter(round.deck.cards)
+    cards[round.trump_card] += 1
+    for player_cards in round.hands:
+        cards.update(player_cards)
+    cards.update(card for card in hand.field_cards if card is not None)
+
+    for trick in round.trick_history:
+        cards.update(trick.field_cards)
+        cards.update(card for card, _player in trick.specials
+                     if card.value in _DRAWN_VALUES)
+
+    # shakers and movers leave the field once they have been replaced
+    discarded = Counter(card for card, _player in hand.specials
+                        if card.value in _DRAWN_VALUES)
+    discarded.subtract(card for card in hand.field_cards
+                       if card is not None and card.value in _DRAWN_VALUES)
+    cards.update(+discarded)
+
+    if cards != _FULL_DECK:
+        missing = _FULL_DECK - cards
+        extra = cards - _FULL_DECK
+        raise InvariantError("Cards not conserved, missing %s, extra %s"
+                             % (sorted(missing.elements()),
+                                sorted(extra.elements())))
+
+
+def _check_tricks(round):
+    if sum(round.tricks_won) != len(round.trick_history):
+        raise InvariantError("%d tricks won out of %d played"
+                             % (sum(round.tricks_won),
+                                len(round.trick_history)))
+
+
+def _check_state(round):
+    hand = round.current_hand
+    field = hand.field_cards
+    player_count = round.player_count
+
+    pending = [(player, card.value) for player, card in enumerate(field)
+               if card is not None and card.value in _DRAWN_VALUES]
+    if len(pending) > 1:
+        raise InvariantError("Several pending specials %s" % pending)
+
+    if round.is_complete():
+        expected = (HandState.complete, None)
+    elif pending:
+        player, value = pending[0]
+        expected = (HandState.shaker_input if value is CardValue.shaker
+                    else HandState.mover_input, player)
+    elif None not in field:
+        expected = (HandState.giver_input,
+                    hand.most_recent_giver_taker.player)
+    else:
+        expected = (HandState.playing, hand.cur_player)
+        filled = [player for player in range(player_count)
+                  if field[player] is not None]
+        turn = [(hand.first_player + offset) % player_count
+                for offset in range(len(filled))]
+        if sorted(turn) != filled or hand.cur_player != (
+                hand.first_player + len(filled)) % player_count:
+            raise InvariantError(
+                "Player %d to play with seats %s filled after player %d led"
+                % (hand.cur_player, filled, hand.first_player))
+
+    if (hand.state, hand.next_player) != expected:
+        raise InvariantError("Hand is %s for player %s, expected %s for %s"
+                             % (hand.state.name, hand.next_player,
+                                expected[0].name, expected[1]))
+
+
+def check_invariants(round):
+    """ Raise InvariantError if round breaks any of the invariants """
+    _check_cards(round)
+    _check_tricks(round)
+    _check_state(round)
+
+
+def play_game(seed, choices=None):
+    """ Play the game of seed, checking the invariants after every move
+
+    Moves are picked at random unless choices gives the index into the legal
+    moves for each step, in which case only those steps are played.
+    Returns (choices made, moves, the exception raised or None).
+    """
+    round = Round.start_new_round(random.Random(seed))
+    round.notify = False
+    rng = random.Random('%s:moves' % seed)
+    made = []
+    played = []
+    try:
+        check_invariants(round)
+        while choices is None or len(made) < len(choices):
+            moves = legal_moves(round)
+            if not moves:
+                break
+
+            if choices is None:
+                choice = rng.randrange(len(moves))
+            else:
+                choice = choices[len(made)] % len(moves)
+            made.append(choice)
+            played.append(moves[choice])
+
+            getattr(round, moves[choice][0])(*moves[choice][1:])
+            check_invariants(round)
+
+        if choices is None:
+            if not round.is_complete():
+                raise InvariantError("No legal moves in an unfinished round")
+            if len(round.trick_history) != len(round.dealt_hands[0]):
+                raise InvariantError("%d tricks in a complete round"
+                                     % len(round.trick_history))
+    except Exception as exc:  # pylint: disable=W0703
+        return made, played, exc
+
+    return made, played, None
+
+
+def _failure(seed, choices):
+    made, played, error = play_game(seed, choices)
+    if error is None:
+        return None
+    return Failure(seed, made, format_moves(played), repr(error))
+
+
+def _simpler(choices):
+    """ Candidate simplifications, the shortest first """
+    for step in reversed(range(len(choices))):
+        yield choices[:step] + choices[step + 1:]
+    for step in range(len(choices)):
+        if choices[step]:
+            yield choices[:step] + [0] + choices[step + 1:]
+
+
+def shrink(failure):
+    """ Simpler choices for failure.seed that still fail
+
+    Each pass tries deleting every choice and then zeroing every choice,
+    keeping whatever still fails, until a pass changes nothing.
+    """
+    changed = True
+    while changed:
+        changed = False
+        for simpler in _simpler(list(failure.choices)):
+            # replay stops at simpler's end, so anything that fails is
+            # shorter or has smaller choices, and the loop ends
+            shrunk = _failure(failure.seed, simpler)
+            if shrunk is not None:
+                failure = shrunk
+                changed = True
+                break
+    return failure
+
+
+def fuzz_games(seeds):
+    """ The Failures of the games of seeds, unshrunk """
+    failures = []
+    for seed in seeds:
+        made, played, error = play_game(seed)
+        if error is not None:
+            failures.append(Failure(seed, made, format_moves(played),
+                                    repr(error)))
+    return failures
+
+
+def fuzz(games, chunk_games=1000, processes=None, seed=0, max_failures=10):
+    """ Play games across a process pool and return the shrunk Failures
+
+    Stops early once max_failures games have failed.
+    """
+    failures = []
+
+    def collect(chunk):
+        failures.extend(chunk)
+        return len(failures) >= max_failures
+
+    run_chunks(fuzz_games,
+               ((['%s:%s' % (seed, game)
+                  for game in range(start, min(start + chunk_games, games))],)
+                for start in range(0, games, chunk_games)),
+               collect, processes)
+    return [shrink(failure) for failure in failures[:max_failures]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=100000)
+    parser.add_argument('--chunk-games', type=int, default=1000)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', default='0')
+    args = parser.parse_args(argv)
+
+    failures = fuzz(args.games, args.chunk_games, args.processes, args.seed)
+    for failure in failures:
+        print('seed %s after %d moves: %s' % (failure.seed,
+                                              len(failure.choices),
+                                              failure.error))
+        print('    choices %s' % ' '.join(str(choice)
+                                          for choice in failure.choices))
+        print('    moves   %s' % failure.moves)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,181 @@
+""" Compact text notation for cards and move logs
+
+Every card is two characters, its value then its suit:
+
+    2S 9H JC QD KS      numbered cards, suits S H C D
+    Sh Gv Tk Mv         shaker, giver, taker and mover
+    --                  no card (NO_CARD)
+
+so a run of cards is written without separators and read back by slicing.
+Conversion goes through the card codes (see lohai.game.deck.card_from_code)
+with lookup tables in both directions.
+
+A move (see Round.apply_moves) is the acting player's seat followed by:
+
+    0JD     play_card, the card played
+    1s2     handle_shaker, the victim
+    3m20    handle_mover, the source and the destination
+    3g1     handle_giver, the victim
+
+and a move log is its moves separated by single spaces.
+"""
+from lohai.game.deck import (CardValue, NO_CARD, Suit, card_from_code,
+                             decode_cards, encode_cards)
+
+
+_SUIT_LETTERS = {Suit.spade: 'S',
+                 Suit.heart: 'H',
+                 Suit.club: 'C',
+                 Suit.diamond: 'D'}
+
+_VALUE_LETTERS = {CardValue.jack: 'J',
+                  CardValue.queen: 'Q',
+                  CardValue.king: 'K'}
+
+_SPECIAL_NOTATION = {CardValue.shaker: 'Sh',
+                     CardValue.giver: 'Gv',
+                     CardValue.taker: 'Tk',
+                     CardValue.mover: 'Mv'}
+
+_NO_CARD_NOTATION = '--'
+
+
+def _build_tables():
+    notation_by_code = [None] * 256
+    for value in CardValue.number_values():
+        for suit in Suit.all_suits():
+            notation_by_code[suit << 4 | value] = (
+                _VALUE_LETTERS.get(value, str(int(value)))
+                + _SUIT_LETTERS[suit])
+    for value, notation in _SPECIAL_NOTATION.items():
+        notation_by_code[Suit.none << 4 | value] = notation
+    notation_by_code[NO_CARD] = _NO_CARD_NOTATION
+
+    code_by_notation = dict((notation, code)
+                            for code, notation in enumerate(notation_by_code)
+                            if notation is not None)
+    return notation_by_code, code_by_notation
+
+
+_NOTATION_BY_CODE, _CODE_BY_NOTATION = _build_tables()
+
+
+def notation_from_code(code):
+    notation = _NOTATION_BY_CODE[code]
+    if notation is None:
+        raise ValueError("%s is not a valid card code" % code)
+    return notation
+
+
+def code_from_notation(notation):
+    try:
+        return _CODE_BY_NOTATION[notation]
+    except KeyError:
+        raise ValueError("%r is not a card" % (notation,))
+
+
+def format_card(card):
+    """ The notation of a card, '--' for None """
+    return notation_from_code(NO_CARD if card is None else card.code)
+
+
+def parse_card(notation):
+    """ The shared card instance for a notation, None for '--' """
+    return card_from_code(code_from_notation(notation))
+
+
+def format_codes(codes):
+    """ The notation of a run of card codes, e.g. an encode_cards result """
+    notation_by_code = _NOTATION_BY_CODE
+    try:
+        return ''.join([notation_by_code[code] for code in bytearray(codes)])
+    except TypeError:
+        raise ValueError("%r holds an invalid card code" % (codes,))
+
+
+def parse_codes(text):
+    """ The card codes of a run of card notations, as a bytearray """
+    if len(text) % 2:
+        raise ValueError("%r is not a run of two character cards" % (text,))
+
+    code_by_notation = _CODE_BY_NOTATION
+    try:
+        return bytearray([code_by_notation[text[index:index + 2]]
+                          for index in range(0, len(text), 2)])
+    except KeyError as exc:
+        raise ValueError("%r is not a card" % (exc.args[0],))
+
+
+def format_cards(cards):
+    """ The notation of cards (or None), e.g. a hand or a field """
+    return format_codes(encode_cards(cards))
+
+
+def parse_cards(text):
+    return decode_cards(parse_codes(text))
+
+
+def _format_play_card(player, card):
+    return '%d%s' % (player, format_card(card))
+
+
+def _format_handle_shaker(player, victim):
+    return '%ds%d' % (player, victim)
+
+
+def _format_handle_mover(player, source, dest):
+    return '%dm%d%d' % (player, source, dest)
+
+
+def _format_handle_giver(player, victim):
+    return '%dg%d' % (player, victim)
+
+
+_MOVE_FORMATTERS = {'play_card': _format_play_card,
+                    'handle_shaker': _format_handle_shaker,
+                    'handle_mover': _format_handle_mover,
+                    'handle_giver': _format_handle_giver}
+
+# action letter: (action, number of seat arguments)
+_MOVE_LETTERS = {'s': ('handle_shaker', 1),
+                 'm': ('handle_mover', 2),
+                 'g': ('handle_giver', 1)}
+
+
+def format_move(move):
+    try:
+        formatter = _MOVE_FORMATTERS[move[0]]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError("%r is not a move" % (move,))
+    return formatter(*move[1:])
+
+
+def parse_move(notation):
+    """ The move tuple of a move notation, see Round.apply_moves """
+    if len(notation) < 3 or not notation[0].isdigit():
+        raise ValueError("%r is not a move" % (notation,))
+
+    player = int(notation[0])
+    letter = notation[1]
+    if letter in _MOVE_LETTERS:
+        action, seats = _MOVE_LETTERS[letter]
+        arguments = notation[2:]
+        if len(arguments) != seats or not arguments.isdigit():
+            raise ValueError("%r is not a move" % (notation,))
+        return (action, player) + tuple(int(seat) for seat in arguments)
+
+    if len(notation) != 3:
+        raise ValueError("%r is not a move" % (notation,))
+    card = parse_card(notation[1:])
+    if card is None:
+        raise ValueError("%r plays no card" % (notation,))
+    return ('play_card', player, card)
+
+
+def format_moves(moves):
+    """ The move log of a sequence of moves """
+    return ' '.join([format_move(move) for move in moves])
+
+
+def parse_moves(text):
+    return [parse_move(notation) for notation in text.split()]
@@ -1,19 +1,101 @@
 # most recent giver taker wins?
 from collections import namedtuple
 
-import copy
+import enum
 
 import lohai.exception
 import lohai.events
 import lohai.game.deck
 
 from lohai.events import Events, event_notify
-from lohai.game.deck import CardValue, SpecialCard
+from lohai.game.deck import CardValue, decode_cards, encode_cards
 
 
 CardPlayer = namedtuple('CardPlayer',  # pylint: disable=C0103
                         ['card', 'player'])
 
+# a completed trick: the final field cards, the lead suit, the player awarded
+# the trick, the CardPlayers of every special card played during it and, for
+# every shaker and mover action, (CardValue, leader) where leader was the
+# field_leader just before the steal or the replacement draw
+Trick = namedtuple('Trick',  # pylint: disable=C0103
+                   ['field_cards', 'lead_suit', 'winner', 'specials',
+                    'displaced'])
+
+PLAYER_COUNT = 4
+HAND_SIZE = 9
+
+# the Round methods that make up a move, as used by Round.apply_moves
+MOVE_ACTIONS = ('play_card', 'handle_shaker', 'handle_mover', 'handle_giver')
+
+# the kind of each argument of a move after the action name
+_MOVE_ARGUMENTS = {'play_card': ('player', 'card'),
+                   'handle_shaker': ('player', 'player'),
+                   'handle_mover': ('player', 'player', 'player'),
+                   'handle_giver': ('player', 'player')}
+
+_MOVE_ERRORS = (lohai.exception.InvalidCard,
+                lohai.exception.NotYourTurn,
+                lohai.exception.InvalidMove)
+
+
+@enum.unique  # pylint: disable=W0232
+class HandState(enum.Enum):
+    """ What a Hand is waiting for
+
+    Every state but playing and complete waits on Hand.input_player.  The
+    hand stays complete, with an empty field, once the round is over.
+    """
+    playing = 0
+    shaker_input = 1
+    mover_input = 2
+    giver_input = 3
+    complete = 4
+
+
+def field_leader(field_cards, trump_suit, lead_suit):
+    """ The player of the highest card on a part played field
+
+    Empty seats and pending shakers and movers are ignored.  Returns None if
+    no other card is on the field.
+    """
+    playing = [(player, card) for player, card in enumerate(field_cards)
+               if card is not None
+               and card.value not in (CardValue.shaker, CardValue.mover)]
+    if not playing:
+        return None
+
+    cards = [card for _player, card in playing]
+    return playing[highest_card_player(cards, trump_suit, lead_suit)][0]
+
+
+def highest_card_player(field_cards, trump_suit, lead_suit):
+    """ The player with the highest trump card or highest lead card """
+    def _card_key(card):
+        value = card.value
+        if card.suit == trump_suit:
+            value += 200
+        elif card.suit == lead_suit:
+            value += 100
+
+        return value
+
+    win_card = sorted(field_cards, key=_card_key)[-1]
+    return field_cards.index(win_card)
+
+
+def lo_hai(tricks_won):
+    """ The (Lo, Hai) players: fewest and most tricks
+
+    Either is None when two or more players tie for it.
+    """
+    def _sole(count):
+        players = [player for player, tricks in enumerate(tricks_won)
+                   if tricks == count]
+        return players[0] if len(players) == 1 else None
+
+    return _sole(min(tricks_won)), _sole(max(tricks_won))
+
 
 class Hand(object):
     """ A single hand of a Lohai round (also known as a Trick)
@@ -21,17 +103,85 @@ class Hand(object):
     This object tracks:
         - The cards played on the field
         - Who played the most recent Giver/Taker
+        - The special cards played during the hand
         - The lead suit for the hand
         - Which player went first (canonically in the Round)
         - Which player is expected to go next
         - Calculating the hand winner at the end of the round
+        - Whether it is waiting on a card, on shaker, mover or giver input
+          from a player, or is complete (see HandState)
     """
+    __slots__ = ['round', 'most_recent_giver_taker', 'lead_suit',
+                 'first_player', 'cur_player', 'field_cards', 'specials',
+                 'displaced', 'state', 'input_player', '_filled']
+
     def __init__(self, round, first_player):
         self.round = round
+        self.field_cards = [None] * self.round.player_count
+        self.reset(first_player)
+
+    def reset(self, first_player):
+        """ Clear the hand for the next trick, reusing its field list """
         self.most_recent_giver_taker = None
         self.lead_suit = None
         self.first_player = self.cur_player = first_player
-        self.field_cards = [None] * self.round.player_count
+        for player in range(len(self.field_cards)):
+            self.field_cards[player] = None
+        self.specials = ()
+        self.displaced = ()
+        self.state = HandState.playing
+        self.input_player = None
+        self._filled = 0
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # hands pickled before Hand had __slots__ lack the newer attributes
+        state.setdefault('specials', ())
+        state.setdefault('displaced', ())
+        for name, value in state.items():
+            setattr(self, name, value)
+        if 'state' not in state:
+            self._derive_state()
+
+    def _derive_state(self):
+        """ Work out the state from the field, for hands that don't track it
+        """
+        self._filled = sum(1 for card in self.field_cards if card is not None)
+        self.state = HandState.playing
+        self.input_player = None
+        for player, card in enumerate(self.field_cards):
+            if card is not None and card.value is CardValue.shaker:
+                self._await_input(HandState.shaker_input, player)
+                return
+            if card is not None and card.value is CardValue.mover:
+                self._await_input(HandState.mover_input, player)
+                return
+
+        if self._filled == len(self.field_cards):
+            self.state = HandState.complete
+            giver_taker = self.most_recent_giver_taker
+            if (giver_taker is not None
+                    and giver_taker.card.value is CardValue.giver):
+                self._await_input(HandState.giver_input, giver_taker.player)
+
+    def _await_input(self, state, player):
+        self.state = state
+        self.input_player = player
+
+    def _end_round(self):
+        """ Leave the hand complete, nobody is to act again """
+        self.state = HandState.complete
+        self.input_player = None
+
+    @property
+    def next_player(self):
+        """ The player expected to act next, None once the hand is complete
+        """
+        if self.state is HandState.playing:
+            return self.cur_player
+        return self.input_player
 
     def _is_valid_play(self, player, card):
         if not self.round.player_has_card(player, card):
@@ -47,6 +197,9 @@ class Hand(object):
             raise lohai.exception.InvalidCard("Must play a lead suit card")
 
     def _send_event_for_player(self, player, event):
+        if not self.round.notify:
+            return
+
         event_notify(self.round.game_id,
                      self.round.id_for_player(player),
                      event)
@@ -55,24 +208,33 @@ class Hand(object):
         self._play_card_to_field(player, self.round.draw_card())
 
     def _play_card_to_field(self, player, card):
+        if self.field_cards[player] is None:
+            self._filled += 1
         self.field_cards[player] = card
+        if card.is_special:
+            self.specials += (CardPlayer(card, player),)
 
         if card.value is CardValue.mover:
             if self.round.player_can_mover(player):
+                self._await_input(HandState.mover_input, player)
                 self._send_event_for_player(player, Events.mover_input_needed)
                 return
 
             # can't use the mover, play from the deck
+            self._record_displaced(card)
             self._play_card_from_deck(player)
+            return
 
         if card.value is CardValue.shaker:
-            if not len(filter(None, self.field_cards)) > 1:
-                # no other cards on the field, play from deck
-                self._play_card_from_deck(player)
-            else:
+            if self._filled > 1:
                 # Signal we need to shake a card
+                self._await_input(HandState.shaker_input, player)
                 self._send_event_for_player(player, Events.shaker_input_needed)
-                return
+            else:
+                # no other cards on the field, play from deck
+                self._record_displaced(card)
+                self._play_card_from_deck(player)
+            return
 
         if card.value in (CardValue.taker, CardValue.giver):
             self.most_recent_giver_taker = CardPlayer(card, player)
@@ -82,12 +244,27 @@ class Hand(object):
 
         self.cur_player = (self.cur_player + 1) % self.round.player_count
 
+        if self._filled == len(self.field_cards):
+            self.state = HandState.complete
+        else:
+            self.state = HandState.playing
+        self.input_player = None
+
+    def _record_displaced(self, card):
+        leader = field_leader(self.field_cards, self.round.trump_suit,
+                              self.lead_suit)
+        self.displaced += ((card.value, leader),)
+
     def hand_complete(self):
-        return (None not in self.field_cards
-                and SpecialCard(CardValue.shaker) not in self.field_cards
-                and SpecialCard(CardValue.mover) not in self.field_cards)
+        """ Every card is on the field and no shaker or mover is pending """
+        return self.state in (HandState.complete, HandState.giver_input)
 
     def play_card(self, player, card):
+        if self.state is not HandState.playing:
+            raise lohai.exception.InvalidMove(
+                "Waiting on %s from player %s" % (self.state.name,
+                                                  self.input_player))
+
         if self.cur_player != player:
             raise lohai.exception.NotYourTurn("Not player number %s turn"
                                               % player)
@@ -102,16 +279,20 @@ class Hand(object):
         self._play_card_to_field(player, card)
 
     def handle_mover(self, player, source, dest):
-        if not self.field_cards[player].value is CardValue.mover:
+        if (self.state is not HandState.mover_input
+                or self.input_player != player):
             raise lohai.exception.InvalidMove(
                 "Player %d doesn't have a mover on the board" % player)
+        card = self.field_cards[player]
 
         self.round.transfer_trick(source, dest)
 
+        self._record_displaced(card)
         self._play_card_from_deck(player)
 
     def handle_shaker(self, player, victim):
-        if not self.field_cards[player].value is CardValue.shaker:
+        if (self.state is not HandState.shaker_input
+                or self.input_player != player):
             raise lohai.exception.InvalidMove(
                 "Player %d hasn't played a shaker" % player)
 
@@ -119,14 +300,13 @@ class Hand(object):
             raise lohai.exception.InvalidMove(
                 "Cannot steal from player %d, no card" % victim)
 
+        self._record_displaced(self.field_cards[player])
         self.field_cards[player] = self.field_cards[victim]
         self.field_cards[victim] = None
+        self._filled -= 1
         self._play_card_from_deck(victim)
 
     def verify_giver_ok(self, player, victim):
-        if not self.hand_complete():
-            raise lohai.exception.InvalidMove("Round is not yet over")
-
         if self.most_recent_giver_taker is None:
             raise lohai.exception.InvalidMove("No giver has been played")
 
@@ -138,6 +318,9 @@ class Hand(object):
             raise lohai.exception.InvalidMove(
                 "Player %s did not play a giver", player)
 
+        if self.state is not HandState.giver_input:
+            raise lohai.exception.InvalidMove("Round is not yet over")
+
         if player == victim:
             raise lohai.exception.InvalidMove("Not allowed to give to self")
 
@@ -148,24 +331,14 @@ class Hand(object):
             if card.value is CardValue.taker:
                 return player
             elif card.value is CardValue.giver:
+                self._await_input(HandState.giver_input, player)
                 self._send_event_for_player(player, Events.giver_input_needed)
                 return
             else:
                 raise Exception("Card %s is not a giver or taker" % card)
 
-        # find the player with the highest trump card or highest lead card
-        def _card_key(card):
-            value = card.value
-            if card.suit == self.round.trump_suit:
-                value += 200
-            elif card.suit == self.lead_suit:
-                value += 100
-
-            return value
-
-        win_card = sorted(self.field_cards, key=_card_key)[-1]
-        winner = self.field_cards.index(win_card)
-        return winner
+        return highest_card_player(self.field_cards, self.round.trump_suit,
+                                   self.lead_suit)
 
 
 class Round(object):
@@ -178,24 +351,58 @@ class Round(object):
         - The pointvalue of the round
         - The player who lead the most recent hand
         - The trick count for each player
+        - The dealt hands and the completed tricks
     """
+    __slots__ = ['deck', 'hands', '_deal', 'trump_card', 'pointvalue',
+                 'trump_suit', '_player_count', 'first_player', 'tricks_won',
+                 'trick_history', 'most_recent_giver_taker',
+                 'need_giver_input', 'notify', 'current_hand', 'game_id']
+
     def __init__(self, deck, hands, trump_card):
         self.deck = deck
         self.hands = hands
+        # the dealt hands as card codes, padded to the largest hand
+        hand_size = max(len(hand) for hand in hands)
+        self._deal = bytes(b''.join(encode_cards(hand, hand_size)
+                                    for hand in hands))
         self.trump_card = trump_card
         self.pointvalue = trump_card.pointvalue
         self.trump_suit = trump_card.suit
 
-        self._player_count = 4
+        self._player_count = PLAYER_COUNT
         self.first_player = 0
 
         self.tricks_won = [0] * self.player_count
+        self.trick_history = []
         self.most_recent_giver_taker = None
         self.need_giver_input = False
+        self.notify = True
+        self.game_id = -1
 
         self.current_hand = None
         self._start_new_trick(self.first_player)
 
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # rounds pickled before Round had __slots__ have no record of the
+        # deal or the completed tricks, the deal is rebuilt from the cards
+        # still in hand
+        if '_deal' not in state:
+            hands = state['hands']
+            hand_size = max(len(hand) for hand in hands)
+            state['_deal'] = bytes(b''.join(encode_cards(hand, hand_size)
+                                            for hand in hands))
+        state.setdefault('trick_history', [])
+        state.setdefault('notify', True)
+        state.setdefault('game_id', -1)
+        for name, value in state.items():
+            setattr(self, name, value)
+        # rounds pickled over before _finish_trick ended the round
+        if getattr(self, 'current_hand', None) and self.is_complete():
+            self.current_hand._end_round()  # pylint: disable=W0212
+
     # transition API
     @property
     def this_rounds_cards(self):
@@ -210,8 +417,6 @@ class Round(object):
 
     # public API for Hand
 
-    game_id = -1
-
     @staticmethod
     def id_for_player(player):
         return player
@@ -223,13 +428,21 @@ class Round(object):
     def player_count(self):
         return self._player_count
 
+    @property
+    def dealt_hands(self):
+        hand_size = len(self._deal) // len(self.hands)
+        hands = []
+        for player in range(len(self.hands)):
+            codes = self._deal[player * hand_size:(player + 1) * hand_size]
+            hands.append([card for card in decode_cards(codes)
+                          if card is not None])
+        return hands
+
     def player_has_card(self, player, card):
-        return card in self.get_hand_for_player(player)
+        return card in self.hands[player]
 
     def player_has_suit(self, player, suit):
-        player_hand = self.get_hand_for_player(player)
-        player_suits = set([card.suit for card in player_hand])
-        return suit in player_suits
+        return any(card.suit == suit for card in self.hands[player])
 
     def remove_card_from_hand(self, player, card):
         if not self.player_has_card(player, card):
@@ -239,18 +452,20 @@ class Round(object):
         self.hands[player].remove(card)
 
     def get_hand_for_player(self, player):
-        return copy.deepcopy(self.hands[player])
+        # cards are immutable, only the list needs copying
+        return list(self.hands[player])
 
     # end Hand API
 
     @staticmethod
-    def start_new_round():
-        deck = lohai.game.deck.Deck.shuffle_new_deck()
+    def start_new_round(rng=None):
+        """ Deal a new round, shuffling with rng (default: the random module)
+        """
+        deck = lohai.game.deck.Deck.shuffle_new_deck(rng)
 
-        hands = [list(), list(), list(), list()]
+        hands = [list() for _i in range(PLAYER_COUNT)]
 
-        handsize = 9
-        for _i in range(handsize):
+        for _i in range(HAND_SIZE):
             for hand in hands:
                 hand.append(deck.draw_card())
 
@@ -268,32 +483,54 @@ class Round(object):
 
         return min_score < player_score and player_score < max_score
 
+    def lo_hai(self):
+        return lo_hai(self.tricks_won)
+
+    def is_complete(self):
+        """ Every card has been played and the last trick awarded """
+        return (not any(self.hands)
+                and all(card is None for card in self.this_rounds_cards))
+
     def play_card(self, player, card):
         self.current_hand.play_card(player, card)
+        self._check_trick_complete()
 
-        if self.current_hand.hand_complete():
+    def _check_trick_complete(self):
+        if self.current_hand.state is HandState.complete:
             self._process_trick_winner()
 
     def _start_new_trick(self, first_player):
-        self.current_hand = Hand(self, first_player)
+        if self.current_hand is None:
+            self.current_hand = Hand(self, first_player)
+        else:
+            self.current_hand.reset(first_player)
+
+    def _finish_trick(self, winner):
+        hand = self.current_hand
+        self.trick_history.append(Trick(tuple(hand.field_cards),
+                                        hand.lead_suit, winner,
+                                        hand.specials, hand.displaced))
+        self.tricks_won[winner] += 1
+        self._start_new_trick(winner)
+        if not any(self.hands):
+            self.current_hand._end_round()  # pylint: disable=W0212
 
     def _process_trick_winner(self):
         winner = self.current_hand.process_trick_winner()
-        if winner:
-            self.tricks_won[winner] += 1
-            self._start_new_trick(winner)
+        if winner is not None:
+            self._finish_trick(winner)
 
     def handle_shaker(self, player, victim):
         self.current_hand.handle_shaker(player, victim)
+        self._check_trick_complete()
 
     def handle_giver(self, player, victim):
         self.current_hand.verify_giver_ok(player, victim)
-
-        self.tricks_won[victim] += 1
-        self._start_new_trick(victim)
+        self._finish_trick(victim)
 
     def handle_mover(self, player, source, dest):
         self.current_hand.handle_mover(player, source, dest)
+        self._check_trick_complete()
 
     def transfer_trick(self, source, dest):
         if self.tricks_won[source] < 1:
@@ -302,3 +539,59 @@ class Round(object):
 
         self.tricks_won[source] -= 1
         self.tricks_won[dest] += 1
+
+    def _check_move(self, move):
+        """ Reject a malformed move before it is dispatched """
+        if not isinstance(move, (tuple, list)) or not move:
+            raise lohai.exception.InvalidMove("%r is not a move" % (move,))
+
+        kinds = _MOVE_ARGUMENTS.get(move[0]) if isinstance(
+            move[0], str) else None
+        if kinds is None:
+            raise lohai.exception.InvalidMove(
+                "%r is not a move action" % (move[0],))
+
+        if len(move) != len(kinds) + 1:
+            raise lohai.exception.InvalidMove(
+                "%s takes %d arguments" % (move[0], len(kinds)))
+
+        for kind, argument in zip(kinds, move[1:]):
+            if kind == 'card':
+                if not isinstance(argument, lohai.game.deck.Card):
+                    raise lohai.exception.InvalidCard(
+                        "%r is not a card" % (argument,))
+            elif (not isinstance(argument, int) or isinstance(argument, bool)
+                  or not 0 <= argument < self.player_count):
+                raise lohai.exception.InvalidMove(
+                    "%r is not a player" % (argument,))
+
+    def apply_moves(self, moves, notify=True):
+        """ Apply a sequence of moves in a single call
+
+        Each move is a tuple of a MOVE_ACTIONS name, the acting player and the
+        action's remaining arguments, e.g. ('play_card', 0, card) or
+        ('handle_mover', 3, source, dest).  Application stops at the first
+        illegal move by raising IllegalMove; the moves before it stay applied.
+        Malformed moves (an unknown action, the wrong number of arguments
+        or an out of range player) are illegal too.  Replays and imports can
+        pass notify=False to skip per-move events.
+
+        Returns the number of moves applied.
+        """
+        actions = dict((name, getattr(self, name)) for name in MOVE_ACTIONS)
+
+        previous_notify = self.notify
+        self.notify = notify
+        applied = 0
+        try:
+            for move in moves:
+                try:
+                    self._check_move(move)
+                    actions[move[0]](*move[1:])
+                except _MOVE_ERRORS as exc:
+                    raise lohai.exception.IllegalMove(applied, move, exc)
+                applied += 1
+        finally:
+            self.notify = previous_notify
+
+        return applied
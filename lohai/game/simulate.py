@@ -0,0 +1,77 @@
+""" Playing whole rounds with computer policies
+
+A policy is a callable policy(round, player, moves, rng) returning one of the
+legal moves offered to it.  Moves use the Round.apply_moves format.
+"""
+import random
+
+from lohai.game.round import HandState, Round
+
+
+def _playable_cards(round, player):
+    hand = round.current_hand
+    cards = round.hands[player]
+    if (hand.lead_suit is not None
+            and round.player_has_suit(player, hand.lead_suit)):
+        cards = [card for card in cards
+                 if card.is_special or card.suit == hand.lead_suit]
+    return cards
+
+
+def legal_moves(round):
+    """ Every move that may be made next in the round
+
+    All of the moves belong to the same player.  Returns an empty list once
+    the round is complete.
+    """
+    hand = round.current_hand
+    players = range(round.player_count)
+    state = hand.state
+    player = hand.next_player
+
+    if state is HandState.complete:
+        return []
+
+    if state is HandState.giver_input:
+        return [('handle_giver', player, victim) for victim in players
+                if victim != player]
+
+    if state is HandState.shaker_input:
+        return [('handle_shaker', player, victim) for victim in players
+                if victim != player and hand.field_cards[victim] is not None]
+
+    if state is HandState.mover_input:
+        return [('handle_mover', player, source, dest)
+                for source in players for dest in players
+                if source != dest and round.tricks_won[source] > 0]
+
+    # distinct cards only, the two copies of a special card are one move
+    moves = []
+    for card in _playable_cards(round, player):
+        move = ('play_card', player, card)
+        if move not in moves:
+            moves.append(move)
+    return moves
+
+
+def random_policy(round, player, moves, rng):  # pylint: disable=W0613
+    return rng.choice(moves)
+
+
+def play_round(policies, rng=None, round=None):
+    """ Play a round to completion, one policy per seat
+
+    A new round is dealt with rng unless one is given.  Returns the Round.
+    """
+    rng = rng or random.Random()
+    if round is None:
+        round = Round.start_new_round(rng)
+
+    moves = legal_moves(round)
+    while moves:
+        player = moves[0][1]
+        move = policies[player](round, player, moves, rng)
+        getattr(round, move[0])(*move[1:])
+        moves = legal_moves(round)
+
+    return round
@@ -0,0 +1,191 @@
+""" Quick estimates of how many tricks a dealt hand will take
+
+The estimate is the sum, over the cards of the hand, of the chance that the
+card takes the trick it is played into.  First, none of the three opponents
+may play a card that beats it.  Each opponent's card is taken to be any of
+the 42 cards that are neither in the hand nor the trump card, so with h of
+those beating the card the chance is (1 - h / 42) ** 3.
+
+    numbered card   beaten by the higher cards of its suit, every trump if
+                    it isn't one, and the givers and takers; a card that
+                    isn't a trump also needs its suit to be led, which it
+                    is when its holder leads (one trick in four) or, for a
+                    quarter of the other tricks, when someone else does
+    taker           beaten by the other givers and takers
+    giver           gives its trick away, worth nothing
+    shaker, mover   replaced by a draw from the deck, worth the average
+                    numbered card
+
+Which cards beat which only depends on the trump suit, so the beaters are
+precomputed per trump suit as bitmasks over the card codes.  HandEvaluator
+adds a bounded LRU cache keyed by the sorted card codes of the hand and the
+trump card, and evaluates whole deals in bulk.
+
+Over random deals played out at random the four estimates of a deal add up
+to about 8.5 of its 9 tricks.
+"""
+from collections import OrderedDict
+
+from lohai.game.deck import (CardValue, DECK_SIZE, NO_CARD, Suit,
+                             encode_cards)
+from lohai.game.round import HAND_SIZE, PLAYER_COUNT
+
+
+# cards outside the hand and the trump card
+_UNSEEN = DECK_SIZE - HAND_SIZE - 1
+
+_GIVER_TAKER_COPIES = 4
+_GIVER_TAKER_CODES = (Suit.none << 4 | CardValue.giver,
+                      Suit.none << 4 | CardValue.taker)
+_DRAWN_CODES = (Suit.none << 4 | CardValue.shaker,
+                Suit.none << 4 | CardValue.mover)
+
+
+# the chance a card that isn't a trump is played into a trick led in its suit
+_LEAD_CHANCE = (1.0 / PLAYER_COUNT
+                + (1 - 1.0 / PLAYER_COUNT) / len(Suit.all_suits()))
+
+
+def _survival():
+    """ Per count h of unseen beaters, the chance that no opponent plays one
+    """
+    return [(1 - float(beaters) / _UNSEEN) ** (PLAYER_COUNT - 1)
+            for beaters in range(_UNSEEN + 1)]
+
+
+def _beater_masks(trump_suit):
+    """ Per card code, the bitmask of the numbered cards that beat it """
+    masks = [0] * 256
+    for suit in Suit.all_suits():
+        for value in CardValue.number_values():
+            mask = 0
+            for higher in CardValue.number_values():
+                if higher > value:
+                    mask |= 1 << (suit << 4 | higher)
+            if suit != trump_suit and trump_suit != Suit.none:
+                for trump_value in CardValue.number_values():
+                    mask |= 1 << (trump_suit << 4 | trump_value)
+            masks[suit << 4 | value] = mask
+    return masks
+
+
+_SURVIVAL = _survival()
+
+# a special trump card leaves the round without a trump suit
+_TRUMP_SUITS = Suit.all_suits() + [Suit.none]
+
+_BEATER_MASKS = dict((suit, _beater_masks(suit)) for suit in _TRUMP_SUITS)
+
+
+def _numbered_value(trump_suit, code, beaters):
+    value = _SURVIVAL[beaters]
+    if code >> 4 != trump_suit:
+        value *= _LEAD_CHANCE
+    return value
+
+
+# the average over every numbered card with nothing else known
+_DRAW_VALUE = dict(
+    (suit, sum(_numbered_value(suit, card_suit << 4 | value,
+                               bin(_BEATER_MASKS[suit][card_suit << 4 | value])
+                               .count('1') + _GIVER_TAKER_COPIES)
+               for card_suit in Suit.all_suits()
+               for value in CardValue.number_values())
+     / (len(Suit.all_suits()) * len(CardValue.number_values())))
+    for suit in _TRUMP_SUITS)
+
+
+def strength_from_codes(codes, trump_code):
+    """ The estimated tricks of a hand given as card codes """
+    trump_suit = trump_code >> 4
+    masks = _BEATER_MASKS[trump_suit]
+    survival = _SURVIVAL
+
+    known = 1 << trump_code
+    givers_takers = 0
+    for code in codes:
+        if code == NO_CARD:
+            continue
+        known |= 1 << code
+        if code in _GIVER_TAKER_CODES:
+            givers_takers += 1
+    unseen_givers_takers = _GIVER_TAKER_COPIES - givers_takers
+
+    strength = 0.0
+    for code in codes:
+        value = code & 0xf
+        if code == NO_CARD:
+            continue
+        elif value == CardValue.taker:
+            strength += survival[unseen_givers_takers]
+        elif value == CardValue.giver:
+            continue
+        elif code in _DRAWN_CODES:
+            strength += _DRAW_VALUE[trump_suit]
+        else:
+            strength += _numbered_value(
+                trump_suit, code,
+                bin(masks[code] & ~known).count('1') + unseen_givers_takers)
+    return strength
+
+
+def hand_strength(hand, trump_card):
+    """ The estimated number of tricks hand takes with trump_card turned up
+    """
+    return strength_from_codes(bytearray(encode_cards(hand)), trump_card.code)
+
+
+class HandEvaluator(object):
+    """ hand_strength with a bounded least recently used cache """
+    def __init__(self, cache_size=65536):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _strength(self, codes, trump_code):
+        key = bytes(bytearray(sorted(codes)) + bytearray([trump_code]))
+        cache = self._cache
+        try:
+            strength = cache.pop(key)
+        except KeyError:
+            self.misses += 1
+            strength = strength_from_codes(codes, trump_code)
+            if not self.cache_size:
+                return strength
+            if len(cache) >= self.cache_size:
+                cache.popitem(last=False)
+        else:
+            self.hits += 1
+        cache[key] = strength
+        return strength
+
+    def evaluate(self, hand, trump_card):
+        return self._strength(bytearray(encode_cards(hand)), trump_card.code)
+
+    def evaluate_deals(self, deals, trumps):
+        """ Strengths of every seat of many deals
+
+        deals holds the card codes of the dealt hands, PLAYER_COUNT *
+        HAND_SIZE per deal, and trumps the trump card code of each deal,
+        e.g. the deal and trump columns of an ArchiveReader.  Returns a list
+        per deal of the strength of each seat.
+        """
+        deals = bytearray(deals)
+        trumps = bytearray(trumps)
+        deal_size = PLAYER_COUNT * HAND_SIZE
+        if len(deals) != len(trumps) * deal_size:
+            raise ValueError("%d deals of card codes for %d trump cards"
+                             % (len(deals) // deal_size, len(trumps)))
+
+        strengths = []
+        for index, trump_code in enumerate(trumps):
+            deal = deals[index * deal_size:(index + 1) * deal_size]
+            strengths.append([
+                self._strength(deal[seat * HAND_SIZE:(seat + 1) * HAND_SIZE],
+                               trump_code)
+                for seat in range(PLAYER_COUNT)])
+        return strengths
@@ -0,0 +1,305 @@
+""" Lockstep engine playing many rounds at once with NumPy
+
+VectorRounds holds the state of N rounds in arrays (hands, decks, field
+cards, lead suits, the most recent giver or taker, the pending input and the
+trick counts) and advances every unfinished round by one move per step with
+masked array operations, including the shaker, mover and giver inputs and
+the cascades of replacement draws.  It follows the rules of
+lohai.game.round exactly: moves are chosen by index into the moves
+lohai.game.simulate.legal_moves would offer, in the same order, so given the
+same deals and choices both engines play identical rounds.
+
+Only the outcome is kept per round: the final field, lead suit and winner
+of every trick, and the tricks won.  Events are not raised.
+
+NumPy is only needed by this module.
+"""
+import numpy
+
+from lohai.game.deck import CardValue, DECK_SIZE, NO_CARD, Suit
+from lohai.game.round import HAND_SIZE, PLAYER_COUNT, HandState
+
+
+NO_PLAYER = -1
+NO_SUIT = 0xff
+
+_PLAYING = HandState.playing.value
+_SHAKER_INPUT = HandState.shaker_input.value
+_MOVER_INPUT = HandState.mover_input.value
+_GIVER_INPUT = HandState.giver_input.value
+_COMPLETE = HandState.complete.value
+
+_SPECIAL_SUIT = int(Suit.none)
+
+# the (source, dest) pairs of mover moves, in legal_moves order
+_MOVER_PAIRS = numpy.array([(source, dest)
+                            for source in range(PLAYER_COUNT)
+                            for dest in range(PLAYER_COUNT)
+                            if source != dest])
+
+# lower triangle: slot k comes before slot j
+_EARLIER = numpy.tril(numpy.ones((HAND_SIZE, HAND_SIZE), dtype=bool), -1)
+
+
+def _pick(allowed, choices):
+    """ The position of the (choice % count)th allowed entry of each row """
+    counts = allowed.sum(axis=1)
+    wanted = choices % counts
+    ranks = numpy.cumsum(allowed, axis=1) - 1
+    return numpy.argmax(allowed & (ranks == wanted[:, None]), axis=1)
+
+
+class VectorRounds(object):
+    """ The state of many four player rounds, advanced in lockstep """
+    def __init__(self, hands, decks, trumps):
+        """ hands (N, 4, 9), decks (N, 15) and trumps (N,) card codes """
+        self.hands = numpy.array(hands, dtype=numpy.uint8)
+        self.decks = numpy.array(decks, dtype=numpy.uint8)
+        self.trumps = numpy.array(trumps, dtype=numpy.uint8)
+        count = len(self.trumps)
+        self.count = count
+        self.trump_suits = self.trumps >> 4
+
+        self._games = numpy.arange(count)
+        self._next_draw = numpy.zeros(count, dtype=numpy.int64)
+        self.field = numpy.full((count, PLAYER_COUNT), NO_CARD,
+                                dtype=numpy.uint8)
+        self.lead = numpy.full(count, NO_SUIT, dtype=numpy.uint8)
+        self.first_player = numpy.zeros(count, dtype=numpy.int64)
+        self.cur_player = numpy.zeros(count, dtype=numpy.int64)
+        self.filled = numpy.zeros(count, dtype=numpy.int64)
+        self.state = numpy.full(count, _PLAYING, dtype=numpy.int64)
+        self.input_player = numpy.full(count, NO_PLAYER, dtype=numpy.int64)
+        self.giver_taker_value = numpy.full(count, NO_CARD,
+                                            dtype=numpy.uint8)
+        self.giver_taker_player = numpy.full(count, NO_PLAYER,
+                                             dtype=numpy.int64)
+        self.tricks_won = numpy.zeros((count, PLAYER_COUNT),
+                                      dtype=numpy.int64)
+        self.tricks_played = numpy.zeros(count, dtype=numpy.int64)
+        self.moves = numpy.zeros(count, dtype=numpy.int64)
+
+        # the outcome of each trick, as in the archive columns
+        self.trick_fields = numpy.full((count, HAND_SIZE, PLAYER_COUNT),
+                                       NO_CARD, dtype=numpy.uint8)
+        self.trick_leads = numpy.full((count, HAND_SIZE), NO_SUIT,
+                                      dtype=numpy.uint8)
+        self.trick_winners = numpy.full((count, HAND_SIZE), NO_PLAYER,
+                                        dtype=numpy.int64)
+
+    @classmethod
+    def from_rounds(cls, rounds):
+        """ Freshly dealt Rounds, e.g. from Round.start_new_round """
+        hands = []
+        decks = []
+        trumps = []
+        for round in rounds:
+            if round.trick_history or any(round.this_rounds_cards):
+                raise ValueError("Only freshly dealt rounds can be loaded")
+            hands.append([[card.code for card in hand]
+                          for hand in round.hands])
+            decks.append([card.code for card in round.deck.cards])
+            trumps.append(round.trump_card.code)
+        return cls(hands, decks, trumps)
+
+    @classmethod
+    def deal(cls, count, rng=None):
+        """ Deal count rounds, shuffling with a numpy.random.Generator """
+        rng = rng if rng is not None else numpy.random.default_rng()
+        codes = [suit << 4 | value for value in CardValue.number_values()
+                 for suit in Suit.all_suits()]
+        for value in CardValue.special_values():
+            codes.extend([Suit.none << 4 | value] * 2)
+
+        order = numpy.argsort(rng.random((count, DECK_SIZE)), axis=1)
+        cards = numpy.array(codes, dtype=numpy.uint8)[order]
+        # dealt one card to each player in turn, as start_new_round does
+        dealt = PLAYER_COUNT * HAND_SIZE
+        hands = cards[:, :dealt].reshape(count, HAND_SIZE,
+                                         PLAYER_COUNT).transpose(0, 2, 1)
+        return cls(hands, cards[:, dealt + 1:], cards[:, dealt])
+
+    def active(self):
+        return self.tricks_played < HAND_SIZE
+
+    def _draw(self, games):
+        cards = self.decks[games, self._next_draw[games]]
+        self._next_draw[games] += 1
+        return cards
+
+    def _can_mover(self, games, players):
+        tricks = self.tricks_won[games]
+        score = tricks[numpy.arange(len(games)), players]
+        return (tricks.min(axis=1) < score) & (score < tricks.max(axis=1))
+
+    def _place(self, games, players, cards):
+        """ Hand._play_card_to_field for one card in each of games """
+        while len(games):
+            self.filled[games] += self.field[games, players] == NO_CARD
+            self.field[games, players] = cards
+
+            values = cards & 0xf
+            special = (cards >> 4) == _SPECIAL_SUIT
+            mover = special & (values == CardValue.mover)
+            shaker = special & (values == CardValue.shaker)
+
+            can_mover = mover & self._can_mover(games, players)
+            can_shake = shaker & (self.filled[games] > 1)
+            waiting = can_mover | can_shake
+            self.state[games[can_mover]] = _MOVER_INPUT
+            self.state[games[can_shake]] = _SHAKER_INPUT
+            self.input_player[games[waiting]] = players[waiting]
+
+            played = ~(mover | shaker)
+            done = games[played]
+            giver_taker = played & special & (
+                (values == CardValue.taker) | (values == CardValue.giver))
+            self.giver_taker_value[games[giver_taker]] = values[giver_taker]
+            self.giver_taker_player[games[giver_taker]] = players[giver_taker]
+
+            leads = played & ~special & (self.lead[games] == NO_SUIT)
+            self.lead[games[leads]] = cards[leads] >> 4
+
+            self.cur_player[done] = (self.cur_player[done] + 1) % PLAYER_COUNT
+            self.state[done] = numpy.where(self.filled[done] == PLAYER_COUNT,
+                                           _COMPLETE, _PLAYING)
+            self.input_player[done] = NO_PLAYER
+
+            # unusable shakers and movers are replaced from the deck
+            redraw = (mover | shaker) & ~waiting
+            games = games[redraw]
+            players = players[redraw]
+            cards = self._draw(games)
+
+    def _finish_tricks(self, games, winners):
+        tricks = self.tricks_played[games]
+        self.trick_fields[games, tricks] = self.field[games]
+        self.trick_leads[games, tricks] = self.lead[games]
+        self.trick_winners[games, tricks] = winners
+        self.tricks_won[games, winners] += 1
+        self.tricks_played[games] += 1
+
+        self.field[games] = NO_CARD
+        self.lead[games] = NO_SUIT
+        self.first_player[games] = winners
+        self.cur_player[games] = winners
+        self.filled[games] = 0
+        self.state[games] = _PLAYING
+        self.input_player[games] = NO_PLAYER
+        self.giver_taker_value[games] = NO_CARD
+        self.giver_taker_player[games] = NO_PLAYER
+
+    def _check_complete(self, games):
+        """ Round._check_trick_complete for games """
+        games = games[self.state[games] == _COMPLETE]
+        if not len(games):
+            return
+
+        values = self.giver_taker_value[games]
+        taker = values == CardValue.taker
+        giver = values == CardValue.giver
+        self.state[games[giver]] = _GIVER_INPUT
+        self.input_player[games[giver]] = self.giver_taker_player[games[giver]]
+
+        highest = games[~(taker | giver)]
+        field = self.field[highest]
+        suits = field >> 4
+        keys = (field & 0xf).astype(numpy.int64)
+        trump = suits == self.trump_suits[highest][:, None]
+        keys += numpy.where(trump, 200, 0)
+        keys += numpy.where(~trump & (suits == self.lead[highest][:, None]),
+                            100, 0)
+        # ties go to the later seat, as in highest_card_player
+        winners = PLAYER_COUNT - 1 - numpy.argmax(keys[:, ::-1], axis=1)
+
+        self._finish_tricks(numpy.concatenate([games[taker], highest]),
+                            numpy.concatenate(
+                                [self.giver_taker_player[games[taker]],
+                                 winners]))
+
+    def _play_cards(self, games, choices):
+        players = self.cur_player[games]
+        hands = self.hands[games, players]
+        suits = hands >> 4
+        held = hands != NO_CARD
+        special = suits == _SPECIAL_SUIT
+
+        leads = self.lead[games][:, None]
+        follow = ((suits == leads) & held).any(axis=1) & (
+            self.lead[games] != NO_SUIT)
+        playable = held & (special | (suits == leads) | ~follow[:, None])
+
+        # distinct cards only, the first copy of each
+        same = (hands[:, :, None] == hands[:, None, :]) & playable[:, None, :]
+        first = playable & ~(same & _EARLIER).any(axis=2)
+
+        slots = _pick(first, choices)
+        cards = hands[numpy.arange(len(games)), slots]
+        self.hands[games, players, slots] = NO_CARD
+        self._place(games, players, cards)
+
+    def _handle_shakers(self, games, choices):
+        players = self.input_player[games]
+        seats = numpy.arange(PLAYER_COUNT)
+        victims = _pick((self.field[games] != NO_CARD)
+                        & (seats[None, :] != players[:, None]), choices)
+
+        self.field[games, players] = self.field[games, victims]
+        self.field[games, victims] = NO_CARD
+        self.filled[games] -= 1
+        self._place(games, victims, self._draw(games))
+
+    def _handle_movers(self, games, choices):
+        players = self.input_player[games]
+        sources = _MOVER_PAIRS[:, 0]
+        allowed = self.tricks_won[games][:, sources] > 0
+        pairs = _MOVER_PAIRS[_pick(allowed, choices)]
+
+        self.tricks_won[games, pairs[:, 0]] -= 1
+        self.tricks_won[games, pairs[:, 1]] += 1
+        self._place(games, players, self._draw(games))
+
+    def _handle_givers(self, games, choices):
+        players = self.input_player[games]
+        seats = numpy.arange(PLAYER_COUNT)
+        victims = _pick(seats[None, :] != players[:, None], choices)
+        self._finish_tricks(games, victims)
+
+    def step(self, choices):
+        """ Make one move in every unfinished round
+
+        choices holds, per round, an index into its legal moves, taken
+        modulo their number.  Returns the number of rounds that moved.
+        """
+        choices = numpy.asarray(choices, dtype=numpy.int64)
+        games = self._games[self.active()]
+        state = self.state[games]
+        for phase, handler in ((_PLAYING, self._play_cards),
+                               (_SHAKER_INPUT, self._handle_shakers),
+                               (_MOVER_INPUT, self._handle_movers),
+                               (_GIVER_INPUT, self._handle_givers)):
+            moving = games[state == phase]
+            if len(moving):
+                handler(moving, choices[moving])
+
+        self._check_complete(games)
+        self.moves[games] += 1
+        return len(games)
+
+    def play(self, choices=None, rng=None):
+        """ Play every round to the end
+
+        choices is an (N, steps) array of move indices, one column per
+        step; otherwise moves are chosen uniformly at random with rng, a
+        numpy.random.Generator.
+        """
+        rng = rng if rng is not None else numpy.random.default_rng()
+        step = 0
+        while self.active().any():
+            if choices is None:
+                column = rng.integers(0, 1 << 30, self.count)
+            else:
+                column = choices[:, step]
+            self.step(column)
+            step += 1
+        return self
@@ -0,0 +1,36 @@
+""" Chunks of work run across a process pool
+
+The simulation, tournament, fuzzing and export entry points all split their
+work into chunks, keep one chunk per worker in flight and fold the results
+in as they arrive, in submission order, until the work runs out or the
+results are good enough to stop early.
+"""
+import itertools
+
+
+def run_chunks(function, chunk_args, on_result, processes=None):
+    """ Call function(*args) for each args of chunk_args across a pool
+
+    on_result(result) is called in the parent with each result in order;
+    returning a true value stops early, abandoning the chunks in flight.
+    chunk_args may be a generator, only as many chunks as there are
+    processes are submitted ahead.
+    """
+    # the parent of the pool alone needs multiprocessing, not its workers
+    import multiprocessing
+
+    processes = processes or multiprocessing.cpu_count()
+    chunk_args = iter(chunk_args)
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = []
+        while True:
+            for args in itertools.islice(chunk_args,
+                                         processes - len(pending)):
+                pending.append(pool.apply_async(function, args))
+
+            if not pending or on_result(pending.pop(0).get()):
+                return
+    finally:
+        pool.terminate()
+        pool.join()
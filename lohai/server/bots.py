@@ -0,0 +1,184 @@
+""" Batched move decisions for bot seats across many games
+
+Games submit the Rounds where a bot is to move, whether to play a card or to
+give shaker, mover or giver input.  The DecisionBroker collects the pending
+requests for up to window seconds, evaluates them together with a single
+call of a batch policy and applies each chosen move through the Round API.
+
+A batch policy is a callable batch_policy(requests) taking a list of
+(round, player, moves) requests, with moves as from
+lohai.game.simulate.legal_moves, and returning the chosen move for each.
+per_request() turns an ordinary policy into one.
+
+Every request has a latency cap: a batch is evaluated early when waiting
+any longer would keep one of its requests past its cap.  A Round must not
+be changed elsewhere while a decision on it is pending.
+"""
+import random
+import threading
+import time
+
+from lohai.game.simulate import legal_moves
+
+
+def per_request(policy, rng=None):
+    """ A batch policy applying policy(round, player, moves, rng) to each
+    request in turn
+    """
+    rng = rng or random.Random()
+
+    def batch_policy(requests):
+        return [policy(round, player, moves, rng)
+                for round, player, moves in requests]
+    return batch_policy
+
+
+class Decision(object):
+    """ A pending bot move, resolved once it has been applied """
+    __slots__ = ['round', 'player', 'moves', 'deadline', 'move', 'error',
+                 'latency', '_submitted', '_done']
+
+    def __init__(self, round, player, moves, latency_cap):
+        self.round = round
+        self.player = player
+        self.moves = moves
+        self._submitted = time.time()
+        self.deadline = self._submitted + latency_cap
+        self.move = None
+        self.error = None
+        self.latency = None
+        self._done = threading.Event()
+
+    def _finish(self, move=None, error=None):
+        self.move = move
+        self.error = error
+        self.latency = time.time() - self._submitted
+        self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """ The move applied, re-raising any error choosing or applying it
+
+        Returns None if the timeout expired first.
+        """
+        if not self._done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.move
+
+
+class DecisionBroker(object):
+    """ Evaluates bot decisions in batches on a background thread """
+    def __init__(self, batch_policy, window=0.005, max_batch=256,
+                 latency_cap=0.05):
+        self.batch_policy = batch_policy
+        self.window = window
+        self.max_batch = max_batch
+        self.latency_cap = latency_cap
+        self.batches = 0
+        self.decisions = 0
+        self.late = 0
+
+        self._condition = threading.Condition()
+        self._pending = []
+        self._opened = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='lohai-bot-broker')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, round, latency_cap=None):
+        """ Request a move for whoever is to act next in round
+
+        Returns the Decision, or None if the round is complete.
+        """
+        moves = legal_moves(round)
+        if not moves:
+            return None
+
+        decision = Decision(round, moves[0][1], moves,
+                            self.latency_cap if latency_cap is None
+                            else latency_cap)
+        with self._condition:
+            if self._closed:
+                raise ValueError("The decision broker is closed")
+            if not self._pending:
+                self._opened = time.time()
+            self._pending.append(decision)
+            self._condition.notify()
+        return decision
+
+    def _take_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+
+            while not self._closed and len(self._pending) < self.max_batch:
+                closes = min([self._opened + self.window]
+                             + [decision.deadline
+                                for decision in self._pending])
+                remaining = closes - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            self._opened = time.time()
+            return batch
+
+    def _evaluate(self, batch):
+        try:
+            moves = self.batch_policy([(decision.round, decision.player,
+                                        decision.moves)
+                                       for decision in batch])
+            if len(moves) != len(batch):
+                raise ValueError("%d moves chosen for %d requests"
+                                 % (len(moves), len(batch)))
+        except Exception as exc:  # pylint: disable=W0703
+            for decision in batch:
+                decision._finish(error=exc)  # pylint: disable=W0212
+            return
+
+        for decision, move in zip(batch, moves):
+            try:
+                decision.round.apply_moves([move])
+            except Exception as exc:  # pylint: disable=W0703
+                decision._finish(error=exc)  # pylint: disable=W0212
+            else:
+                decision._finish(move)  # pylint: disable=W0212
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            self._evaluate(batch)
+            finished = time.time()
+            self.batches += 1
+            self.decisions += len(batch)
+            self.late += sum(1 for decision in batch
+                             if finished > decision.deadline)
+
+    def close(self):
+        """ Evaluate the pending decisions and stop """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
@@ -0,0 +1,145 @@
+""" Table state updates fanned out to players and spectators
+
+Every viewer of a table belongs to a visibility class: the seat they play
+(who also see their own hand) or SPECTATOR (who see only the public state).
+After each action the table state is diffed against the previous one once,
+the changed parts are projected onto each class, and each class's update is
+encoded once and handed as the same bytes to every viewer in the class.
+
+Updates are compact JSON objects holding only the parts that changed, with
+cards in lohai.game.notation:
+
+    version     the number of actions applied, so gaps can be detected
+    full        present and true on the full state sent to a new viewer
+    trump       the trump card, full state only
+    field       the field cards of the current trick
+    lead        the lead suit, null if none is set
+    state       the HandState name
+    next        the player expected to act next
+    tricks      the tricks won by each player
+    hands       the number of cards in each player's hand
+    deck        the number of cards left in the deck
+    last        [field cards, winner] of the latest completed trick
+    hand        the viewer's own hand, seats only
+
+Applying every update in turn to the full state gives the viewer's view of
+the table after each action.
+"""
+import json
+
+from lohai.game.notation import format_card, format_cards
+
+
+SPECTATOR = 'spectator'
+
+
+def _encode(update):
+    return json.dumps(update, separators=(',', ':'),
+                      sort_keys=True).encode('utf-8')
+
+
+def public_state(round):
+    hand = round.current_hand
+    last = None
+    if round.trick_history:
+        trick = round.trick_history[-1]
+        last = [format_cards(trick.field_cards), trick.winner]
+
+    return {'field': format_cards(hand.field_cards),
+            'lead': None if hand.lead_suit is None else int(hand.lead_suit),
+            'state': hand.state.name,
+            'next': hand.next_player,
+            'tricks': list(round.tricks_won),
+            'hands': [len(cards) for cards in round.hands],
+            'deck': len(round.deck.cards),
+            'last': last}
+
+
+def private_states(round):
+    """ The hand notation of each seat """
+    return [format_cards(cards) for cards in round.hands]
+
+
+class TableFanout(object):
+    """ Publishes the updates of one table to its viewers
+
+    A viewer is a callable taking the encoded update bytes.  Actions go
+    through act(), or publish() is called after the round is changed
+    directly.
+    """
+    def __init__(self, round):
+        self.round = round
+        self.version = 0
+        self._viewers = {}
+        self._public = public_state(round)
+        self._private = private_states(round)
+
+    def viewers(self, visibility=None):
+        if visibility is not None:
+            return list(self._viewers.get(visibility, ()))
+        return [viewer for viewers in self._viewers.values()
+                for viewer in viewers]
+
+    def full_state(self, visibility):
+        update = dict(self._public)
+        update['version'] = self.version
+        update['full'] = True
+        update['trump'] = format_card(self.round.trump_card)
+        if visibility != SPECTATOR:
+            update['hand'] = self._private[visibility]
+        return _encode(update)
+
+    def join(self, viewer, visibility=SPECTATOR):
+        """ Add a viewer, sending them the full state """
+        if visibility != SPECTATOR and not (
+                0 <= visibility < self.round.player_count):
+            raise ValueError("%r is not a seat" % (visibility,))
+
+        self._viewers.setdefault(visibility, []).append(viewer)
+        viewer(self.full_state(visibility))
+
+    def leave(self, viewer):
+        for visibility, viewers in list(self._viewers.items()):
+            if viewer in viewers:
+                viewers.remove(viewer)
+                if not viewers:
+                    del self._viewers[visibility]
+                return
+        raise ValueError("%r is not viewing the table" % (viewer,))
+
+    def act(self, action, player, *args):
+        """ Apply a move (see Round.apply_moves) and publish its update """
+        self.round.apply_moves([(action, player) + args])
+        return self.publish()
+
+    def publish(self):
+        """ Send every viewer the changes since the last publish
+
+        Returns the encoded updates by visibility class.
+        """
+        public = public_state(self.round)
+        private = private_states(self.round)
+        self.version += 1
+
+        delta = dict((key, value) for key, value in public.items()
+                     if self._public[key] != value)
+        delta['version'] = self.version
+        shared = _encode(delta)
+
+        updates = {}
+        for visibility, viewers in self._viewers.items():
+            if (visibility == SPECTATOR
+                    or private[visibility] == self._private[visibility]):
+                update = shared
+            else:
+                seat_delta = dict(delta)
+                seat_delta['hand'] = private[visibility]
+                update = _encode(seat_delta)
+
+            updates[visibility] = update
+            for viewer in viewers:
+                viewer(update)
+
+        self._public = public
+        self._private = private
+        return updates
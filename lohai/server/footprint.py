@@ -0,0 +1,107 @@
+""" Memory footprint of live games and their stored snapshots
+
+    python -m lohai.server.footprint --games 1000
+
+The live footprint of a Round counts every object reachable from it except
+those shared between games: the interned cards, enum members, classes,
+functions and modules.  The snapshot footprint is the size of the pickled
+form used to migrate and store games.
+"""
+import argparse
+import enum
+import gc
+import random
+import sys
+import types
+
+from lohai.game.deck import Deck
+from lohai.game.simulate import legal_moves
+from lohai.game.round import Round
+from lohai.server.shard import dump_round
+
+
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, enum.Enum)
+
+
+def _shared_ids():
+    # every interned card appears in a fresh deck
+    return set(id(card) for card in Deck.shuffle_new_deck().cards)
+
+
+def object_footprint(obj, shared_ids=None):
+    """ Bytes used by obj and everything it references that isn't shared """
+    if shared_ids is None:
+        shared_ids = _shared_ids()
+
+    seen = set(shared_ids)
+    pending = [obj]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, _SHARED_TYPES):
+            continue
+        # small ints, None and the booleans are shared interpreter wide
+        if item is None or isinstance(item, bool) or (
+                isinstance(item, int) and -5 <= item <= 256):
+            continue
+
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        pending.extend(gc.get_referents(item))
+
+    return total
+
+
+def game_footprint(round, shared_ids=None):
+    return object_footprint(round, shared_ids)
+
+
+def snapshot_footprint(round):
+    return len(dump_round(round))
+
+
+def footprint_report(rounds):
+    """ Average live and snapshot bytes per game over rounds, zero if there
+    are none
+    """
+    shared_ids = _shared_ids()
+    count = len(rounds)
+    if not count:
+        return {'games': 0, 'live_bytes_per_game': 0,
+                'snapshot_bytes_per_game': 0}
+    return {'games': count,
+            'live_bytes_per_game': sum(game_footprint(round, shared_ids)
+                                       for round in rounds) // count,
+            'snapshot_bytes_per_game': sum(snapshot_footprint(round)
+                                           for round in rounds) // count}
+
+
+def sample_rounds(games, seed=0):
+    """ Rounds dealt and then played part way with random legal moves """
+    rng = random.Random(seed)
+    rounds = []
+    for _i in range(games):
+        round = Round.start_new_round(rng)
+        for _move in range(rng.randrange(36)):
+            move = rng.choice(legal_moves(round))
+            getattr(round, move[0])(*move[1:])
+        rounds.append(round)
+    return rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    report = footprint_report(sample_rounds(args.games, args.seed))
+    for key in ('games', 'live_bytes_per_game', 'snapshot_bytes_per_game'):
+        print('%-24s %d' % (key, report[key]))
+
+
+if __name__ == '__main__':
+    main()
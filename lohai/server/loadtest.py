@@ -0,0 +1,401 @@
+""" Load testing with simulated players against an in-process game host
+
+    python -m lohai.server.loadtest --profile ramp --tables 250 --duration 60
+
+Every table seats four SimulatedClients.  A client follows its table
+through the updates of a TableFanout and, when it is the player expected to
+act, waits a think time and then makes a random legal move: a card play or a
+shaker, mover or giver input.  Whoever finishes a round deals the next one.
+
+Clients don't get a thread each.  Their updates and moves are tasks on a
+shared scheduler run by a pool of worker threads, so a few threads can drive
+thousands of players and an overloaded host shows up as queueing:
+
+    latency         seconds per host call, by action (start_round for deals)
+    delivery lag    seconds from an update being published to its client
+                    reading it
+    throughput      moves and deals per second
+    memory          resident set size sampled through the run
+
+A profile is a list of (seconds, tables) stages, each holding the given
+number of tables for its seconds: ramp_profile() adds tables in steps and
+soak_profile() holds a fixed number.
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from lohai.game.round import PLAYER_COUNT, Round
+from lohai.game.simulate import legal_moves
+from lohai.server.fanout import TableFanout
+
+
+def percentiles(values):
+    """ count, p50, p90, p99 and max of values, nearest rank """
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+
+    def rank(fraction):
+        return values[max(0, int(math.ceil(fraction * len(values))) - 1)]
+    return {'count': len(values), 'p50': rank(0.5), 'p90': rank(0.9),
+            'p99': rank(0.99), 'max': values[-1]}
+
+
+def current_rss():
+    """ The resident set size of this process in bytes, None if unknown """
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IOError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def ramp_profile(tables, steps, duration):
+    """ tables added in equal steps over duration seconds """
+    return [(float(duration) / steps, tables * (step + 1) // steps)
+            for step in range(steps)]
+
+
+def soak_profile(tables, duration):
+    return [(float(duration), tables)]
+
+
+class LoadMetrics(object):
+    """ Latencies, delivery lags and errors gathered by the clients """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.lags = []
+        self.errors = collections.Counter()
+
+    def record(self, action, seconds):
+        with self._lock:
+            self.latencies[action].append(seconds)
+
+    def record_lag(self, seconds):
+        with self._lock:
+            self.lags.append(seconds)
+
+    def record_error(self, action, exc):
+        with self._lock:
+            self.errors['%s: %s' % (action, type(exc).__name__)] += 1
+
+
+class Scheduler(object):
+    """ Runs callables at given times on a pool of worker threads """
+    def __init__(self, workers, metrics):
+        self.metrics = metrics
+        self._condition = threading.Condition()
+        self._tasks = []
+        self._order = itertools.count()
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run,
+                                          name='lohai-load-%d' % index)
+                         for index in range(workers)]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def schedule(self, delay, task, *args):
+        with self._condition:
+            heapq.heappush(self._tasks, (time.time() + delay,
+                                         next(self._order), task, args))
+            self._condition.notify()
+
+    def _next_task(self):
+        with self._condition:
+            while not self._closed:
+                if self._tasks:
+                    remaining = self._tasks[0][0] - time.time()
+                    if remaining <= 0:
+                        return heapq.heappop(self._tasks)
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _run(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            _due, _order, function, args = task
+            try:
+                function(*args)
+            except Exception as exc:  # pylint: disable=W0703
+                self.metrics.record_error(function.__name__, exc)
+
+    def close(self):
+        """ Stop the workers, dropping the tasks not yet run """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+class _Table(object):
+    __slots__ = ['lock', 'rng', 'fanout', 'clients']
+
+    def __init__(self, rng, clients):
+        self.lock = threading.Lock()
+        self.rng = rng
+        self.fanout = TableFanout(Round.start_new_round(rng))
+        self.clients = clients
+
+
+class GameHost(object):
+    """ The tables under test, each played behind a lock of its own """
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._tables = {}
+
+    def add_table(self, table_id, clients):
+        table = _Table(random.Random('%s:%s' % (self.seed, table_id)),
+                       clients)
+        with table.lock:
+            self._tables[table_id] = table
+            for seat, client in enumerate(clients):
+                table.fanout.join(client.deliver, seat)
+
+    def remove_table(self, table_id):
+        table = self._tables.pop(table_id)
+        with table.lock:
+            for client in table.clients:
+                table.fanout.leave(client.deliver)
+
+    @property
+    def table_count(self):
+        return len(self._tables)
+
+    def legal_moves(self, table_id):
+        """ The next moves at a table, none if it has been removed """
+        table = self._tables.get(table_id)
+        if table is None:
+            return []
+        with table.lock:
+            return legal_moves(table.fanout.round)
+
+    def act(self, table_id, move):
+        """ Apply and publish a move, returning whether the round is over
+
+        Raises KeyError if the table has been removed.
+        """
+        table = self._tables[table_id]
+        with table.lock:
+            table.fanout.act(*move)
+            return table.fanout.round.is_complete()
+
+    def new_round(self, table_id):
+        """ Deal the next round at a table once the last one is over """
+        table = self._tables.get(table_id)
+        if table is None:
+            return
+        with table.lock:
+            if not table.fanout.round.is_complete():
+                return
+            table.fanout = TableFanout(Round.start_new_round(table.rng))
+            for seat, client in enumerate(table.clients):
+                table.fanout.join(client.deliver, seat)
+
+
+class SimulatedClient(object):
+    """ A player who moves at random after a think time
+
+    Updates are queued by deliver() and read in order by one task at a
+    time, as a client connection would.
+    """
+    def __init__(self, host, scheduler, metrics, table_id, seat, think,
+                 rng):
+        self.host = host
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.table_id = table_id
+        self.seat = seat
+        self.think = think
+        self.rng = rng
+        self.state = {}
+
+        self._lock = threading.Lock()
+        self._inbox = collections.deque()
+        self._reading = False
+        self._moving = False
+
+    def think_time(self):
+        """ Lognormal around the median think time, as people are """
+        if self.think <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.think), 0.5)
+
+    def deliver(self, update):
+        with self._lock:
+            self._inbox.append((update, time.time()))
+            if self._reading:
+                return
+            self._reading = True
+        self.scheduler.schedule(0, self.read_updates)
+
+    def read_updates(self):
+        while True:
+            with self._lock:
+                if not self._inbox:
+                    self._reading = False
+                    return
+                update, sent = self._inbox.popleft()
+
+            self.metrics.record_lag(time.time() - sent)
+            update = json.loads(update.decode('utf-8'))
+            if update.get('full'):
+                self.state = update
+            else:
+                self.state.update(update)
+
+            if self.state['next'] != self.seat:
+                continue
+            with self._lock:
+                if self._moving:
+                    continue
+                self._moving = True
+            self.scheduler.schedule(self.think_time(), self.move)
+
+    def move(self):
+        with self._lock:
+            self._moving = False
+        moves = self.host.legal_moves(self.table_id)
+        if not moves or moves[0][1] != self.seat:
+            return
+
+        move = self.rng.choice(moves)
+        started = time.time()
+        try:
+            complete = self.host.act(self.table_id, move)
+        except KeyError:
+            return
+        except Exception as exc:  # pylint: disable=W0703
+            self.metrics.record_error(move[0], exc)
+            return
+        self.metrics.record(move[0], time.time() - started)
+
+        if complete:
+            self.scheduler.schedule(self.think_time(), self.deal)
+
+    def deal(self):
+        started = time.time()
+        self.host.new_round(self.table_id)
+        self.metrics.record('start_round', time.time() - started)
+
+
+def run_load(profile, think=1.0, workers=8, seed=0, sample_interval=1.0):
+    """ Play the tables of each profile stage in turn and report """
+    metrics = LoadMetrics()
+    scheduler = Scheduler(workers, metrics)
+    host = GameHost(seed)
+    rng = random.Random(seed)
+    table_ids = itertools.count()
+    live = []
+
+    rss = [(0.0, current_rss())]
+    started = time.time()
+    try:
+        for seconds, tables in profile:
+            while len(live) < tables:
+                table_id = next(table_ids)
+                host.add_table(table_id, [
+                    SimulatedClient(host, scheduler, metrics, table_id, seat,
+                                    think, random.Random(rng.random()))
+                    for seat in range(PLAYER_COUNT)])
+                live.append(table_id)
+            while len(live) > tables:
+                host.remove_table(live.pop())
+
+            ends = time.time() + seconds
+            while time.time() < ends:
+                time.sleep(max(0, min(sample_interval, ends - time.time())))
+                rss.append((time.time() - started, current_rss()))
+    finally:
+        scheduler.close()
+    elapsed = time.time() - started
+
+    actions = sum(len(latencies)
+                  for latencies in metrics.latencies.values())
+    growth = None
+    if rss[0][1] is not None and rss[-1][1] is not None:
+        growth = rss[-1][1] - rss[0][1]
+    return {'elapsed': elapsed,
+            'tables': max(tables for _seconds, tables in profile),
+            'players': PLAYER_COUNT * max(tables
+                                          for _seconds, tables in profile),
+            'actions': actions,
+            'throughput': actions / elapsed,
+            'latency': dict((action, percentiles(latencies))
+                            for action, latencies
+                            in metrics.latencies.items()),
+            'delivery_lag': percentiles(metrics.lags),
+            'errors': dict(metrics.errors),
+            'rss_growth': growth,
+            'rss_samples': rss}
+
+
+def _print_report(report):
+    print('%-16s %.1f s' % ('elapsed', report['elapsed']))
+    for key in ('tables', 'players', 'actions'):
+        print('%-16s %d' % (key, report[key]))
+    print('%-16s %.1f /s' % ('throughput', report['throughput']))
+    if report['rss_growth'] is not None:
+        print('%-16s %+d KiB' % ('rss growth', report['rss_growth'] // 1024))
+
+    print('%-16s %8s %9s %9s %9s %9s' % ('ms', 'count', 'p50', 'p90', 'p99',
+                                        'max'))
+    rows = sorted(report['latency'].items())
+    rows.append(('delivery lag', report['delivery_lag']))
+    for name, stats in rows:
+        if not stats['count']:
+            continue
+        print('%-16s %8d %9.3f %9.3f %9.3f %9.3f'
+              % (name, stats['count'], 1000 * stats['p50'],
+                 1000 * stats['p90'], 1000 * stats['p99'],
+                 1000 * stats['max']))
+
+    for error, count in sorted(report['errors'].items()):
+        print('error %s: %d' % (error, count))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--profile', choices=['ramp', 'soak'],
+                        default='soak')
+    parser.add_argument('--tables', type=int, default=250)
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--steps', type=int, default=5,
+                        help='ramp steps')
+    parser.add_argument('--think', type=float, default=1.0,
+                        help='median think time in seconds')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.profile == 'ramp':
+        profile = ramp_profile(args.tables, args.steps, args.duration)
+    else:
+        profile = soak_profile(args.tables, args.duration)
+
+    report = run_load(profile, args.think, args.workers, args.seed)
+    if args.json:
+        print(json.dumps(report, sort_keys=True))
+    else:
+        _print_report(report)
+
+
+if __name__ == '__main__':
+    main()
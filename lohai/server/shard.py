@@ -0,0 +1,323 @@
+""" Routing of live games to a pool of worker processes
+
+A Round keeps all of its state in the process that created it, so a single
+process can only use one core's worth of games.  The ShardDispatcher hashes
+game ids onto a pool of worker processes, each of which owns the live Rounds
+of its shard.  Requests and the events they raise travel over a Pipe per
+worker, and games move between workers in their pickled form.
+"""
+import hashlib
+import multiprocessing
+import pickle
+import struct
+import threading
+
+import lohai.events
+
+from lohai.game.round import MOVE_ACTIONS, Round
+
+
+# the Round methods a client is allowed to invoke on a game
+ACTIONS = frozenset(MOVE_ACTIONS)
+
+
+def dump_round(round):
+    return pickle.dumps(round, pickle.HIGHEST_PROTOCOL)
+
+
+def load_round(state):
+    return pickle.loads(state)
+
+
+def shard_weight(game_id, shard):
+    key = ("%s:%s" % (game_id, shard)).encode('utf-8')
+    return struct.unpack('>Q', hashlib.md5(key).digest()[:8])[0]
+
+
+def shard_for_game(game_id, shards):
+    """ Pick the shard owning game_id using rendezvous hashing
+
+    The weights are stable across processes, and removing a shard only moves
+    the games that it owned.
+    """
+    return max(shards, key=lambda shard: shard_weight(game_id, shard))
+
+
+class ShardWorker(object):
+    """ The request loop run inside each worker process """
+    def __init__(self, conn):
+        self.conn = conn
+        self.games = {}
+        self.events = []
+
+    def _record_event(self, game_id, player_id, event_type):
+        if game_id in self.games:
+            self.events.append((game_id, player_id, event_type))
+
+    def run(self):
+        lohai.events.add_handler(self._record_event)
+        while True:
+            op, args = self.conn.recv()
+            if op == 'stop':
+                self.conn.send(('ok', None, []))
+                return
+
+            try:
+                result = getattr(self, 'op_' + op)(*args)
+            except Exception as exc:  # pylint: disable=W0703
+                reply = ('error', exc, self.events)
+            else:
+                reply = ('ok', result, self.events)
+
+            self.events = []
+            self.conn.send(reply)
+
+    def _add_game(self, game_id, round):
+        if game_id in self.games:
+            raise KeyError("Game %s already exists" % game_id)
+
+        round.game_id = game_id
+        self.games[game_id] = round
+
+    def op_new_game(self, game_id):
+        self._add_game(game_id, Round.start_new_round())
+
+    def op_act(self, game_id, action, args):
+        if action not in ACTIONS:
+            raise AttributeError("%s is not a game action" % action)
+
+        return getattr(self.games[game_id], action)(*args)
+
+    def op_act_many(self, requests):
+        results = []
+        for request in requests:
+            try:
+                results.append(self.op_act(*request))
+            except Exception as exc:  # pylint: disable=W0703
+                results.append(exc)
+        return results
+
+    def op_game_ids(self):
+        return list(self.games)
+
+    def op_snapshot(self, game_id):
+        return dump_round(self.games[game_id])
+
+    def op_export_games(self, game_ids):
+        return dict((game_id, dump_round(self.games.pop(game_id)))
+                    for game_id in game_ids)
+
+    def op_import_games(self, states):
+        # all or nothing, so a failed import can be retried elsewhere
+        for game_id in states:
+            if game_id in self.games:
+                raise KeyError("Game %s already exists" % game_id)
+
+        for game_id, state in states.items():
+            self._add_game(game_id, load_round(state))
+
+
+def _worker_main(conn):
+    ShardWorker(conn).run()
+
+
+class _WorkerHandle(object):
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, op, *args):
+        self.conn.send((op, args))
+
+    def receive(self):
+        status, result, events = self.conn.recv()
+        # events raised in the worker are re-raised in this process
+        for event in events:
+            lohai.events.event_notify(*event)
+
+        if status == 'error':
+            raise result
+        return result
+
+    def call(self, op, *args):
+        with self.lock:
+            self.send(op, *args)
+            return self.receive()
+
+
+class ShardDispatcher(object):
+    """ Routes game requests to the worker process owning each game
+
+    Workers are identified by a shard number.  Adding a worker or draining
+    one migrates the affected games to their new owners.  Workers are
+    started with context, a multiprocessing context, or with the default
+    start method of the platform.
+    """
+    def __init__(self, worker_count=None, context=None):
+        self.worker_count = worker_count or multiprocessing.cpu_count()
+        self.context = context or multiprocessing
+        self._workers = {}
+        self._next_shard = 0
+
+    def start(self):
+        for _i in range(self.worker_count):
+            self._spawn_worker()
+
+    def stop(self):
+        for shard in list(self._workers):
+            self._stop_worker(shard)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def shards(self):
+        return sorted(self._workers)
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main,
+                                       args=(child_conn,))
+        process.daemon = True
+        process.start()
+        child_conn.close()
+
+        shard = self._next_shard
+        self._next_shard += 1
+        self._workers[shard] = _WorkerHandle(process, parent_conn)
+        return shard
+
+    def _stop_worker(self, shard):
+        worker = self._workers.pop(shard)
+        worker.call('stop')
+        worker.process.join()
+        worker.conn.close()
+
+    def _worker_for_game(self, game_id):
+        return self._workers[shard_for_game(game_id, self._workers)]
+
+    def shard_for_game(self, game_id):
+        return shard_for_game(game_id, self._workers)
+
+    def new_game(self, game_id, round=None):
+        """ Start a game, either freshly dealt or from an existing Round """
+        worker = self._worker_for_game(game_id)
+        if round is None:
+            worker.call('new_game', game_id)
+        else:
+            worker.call('import_games', {game_id: dump_round(round)})
+
+    def act(self, game_id, action, *args):
+        """ Invoke a Round action on a game, returning its result """
+        return self._worker_for_game(game_id).call('act', game_id, action,
+                                                   args)
+
+    def act_many(self, requests):
+        """ Apply (game_id, action, args) requests across all workers
+
+        Each worker is sent its share of the requests as a single batch
+        before any replies are read, so the workers run in parallel.  Returns
+        a result or exception for each request, in order.
+        """
+        by_shard = {}
+        for index, (game_id, action, args) in enumerate(requests):
+            by_shard.setdefault(self.shard_for_game(game_id), []).append(
+                (index, (game_id, action, tuple(args))))
+
+        workers = [(self._workers[shard], by_shard[shard])
+                   for shard in sorted(by_shard)]
+        results = [None] * len(requests)
+        for worker, _batch in workers:
+            worker.lock.acquire()
+        try:
+            for worker, batch in workers:
+                worker.send('act_many', [request for _index, request in batch])
+
+            # every worker's reply is read, even after an error, so that no
+            # stale reply is left on a pipe for the next call
+            errors = []
+            for worker, batch in workers:
+                try:
+                    replies = worker.receive()
+                except Exception as exc:  # pylint: disable=W0703
+                    errors.append(exc)
+                    continue
+                for (index, _request), result in zip(batch, replies):
+                    results[index] = result
+        finally:
+            for worker, _batch in workers:
+                worker.lock.release()
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def snapshot(self, game_id):
+        """ Return a copy of the game's Round """
+        return load_round(self._worker_for_game(game_id).call('snapshot',
+                                                              game_id))
+
+    def game_ids(self):
+        game_ids = []
+        for worker in self._workers.values():
+            game_ids.extend(worker.call('game_ids'))
+        return game_ids
+
+    def _import_games(self, states, placed=None):
+        """ Import games onto their owners, recording their ids in placed """
+        by_owner = {}
+        for game_id, state in states.items():
+            owner = self._worker_for_game(game_id)
+            by_owner.setdefault(owner, {})[game_id] = state
+
+        for owner, owned in by_owner.items():
+            owner.call('import_games', owned)
+            if placed is not None:
+                placed.extend(owned)
+
+    def _migrate(self, sources):
+        """ Move games held by the given shards onto their current owners """
+        for shard in sources:
+            worker = self._workers[shard]
+            moving = [game_id for game_id in worker.call('game_ids')
+                      if self.shard_for_game(game_id) != shard]
+            if moving:
+                self._import_games(worker.call('export_games', moving))
+
+    def add_worker(self):
+        """ Start another worker and move over the games it now owns """
+        existing = self.shards
+        shard = self._spawn_worker()
+        self._migrate(existing)
+        return shard
+
+    def drain_worker(self, shard):
+        """ Move every game off a worker and shut it down
+
+        The worker is only stopped once its games are placed elsewhere; if
+        that fails the unplaced games are returned to it.
+        """
+        if len(self._workers) < 2:
+            raise ValueError("Cannot drain the last worker")
+
+        worker = self._workers[shard]
+        states = worker.call('export_games', worker.call('game_ids'))
+        del self._workers[shard]
+        placed = []
+        try:
+            self._import_games(states, placed)
+        except Exception:
+            self._workers[shard] = worker
+            worker.call('import_games',
+                        dict((game_id, state) for game_id, state
+                             in states.items() if game_id not in placed))
+            raise
+
+        worker.call('stop')
+        worker.process.join()
+        worker.conn.close()
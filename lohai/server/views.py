@@ -0,0 +1,99 @@
+""" Cached, pre-encoded table views for polling clients
+
+A view is the JSON state of a table as one viewer sees it:
+
+    {"hand":"...","table":{...},"trump":"KH"}
+
+where table is lohai.server.fanout.public_state and hand, the viewer's own
+hand in card notation, is left out for spectators.  Each part is encoded
+once and the views are assembled from the encoded parts, so after an action
+only the parts it touched are rebuilt: the table for every action, and the
+acting player's hand for a card play.  The assembled view bytes are cached
+per (game, viewer) until one of their parts changes.
+"""
+import json
+
+from lohai.game.notation import format_card, format_cards
+from lohai.server.fanout import SPECTATOR, public_state
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'),
+                      sort_keys=True).encode('utf-8')
+
+
+class _GameViews(object):
+    __slots__ = ['round', 'trump', 'table', 'hands', 'views']
+
+    def __init__(self, round):
+        self.round = round
+        self.trump = _encode(format_card(round.trump_card))
+        self.table = None
+        self.hands = [None] * round.player_count
+        self.views = {}
+
+
+class ViewCache(object):
+    """ Encoded views of many games, rebuilt only where actions touch them
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._games = {}
+
+    def add_game(self, game_id, round):
+        if game_id in self._games:
+            raise KeyError("Game %s already exists" % game_id)
+        self._games[game_id] = _GameViews(round)
+
+    def remove_game(self, game_id):
+        del self._games[game_id]
+
+    def invalidate(self, game_id, table=True, seats=None):
+        """ Drop the cached parts of a game changed outside act()
+
+        seats are the players whose hands changed, all of them by default.
+        """
+        game = self._games[game_id]
+        if seats is None:
+            seats = range(game.round.player_count)
+        for seat in seats:
+            game.hands[seat] = None
+            game.views.pop(seat, None)
+        if table:
+            game.table = None
+            game.views.clear()
+
+    def act(self, game_id, action, player, *args):
+        """ Apply a move (see Round.apply_moves) and invalidate its parts """
+        game = self._games[game_id]
+        game.round.apply_moves([(action, player) + args])
+        self.invalidate(game_id, table=True,
+                        seats=[player] if action == 'play_card' else [])
+
+    def view(self, game_id, viewer=SPECTATOR):
+        """ The encoded view of a game for a seat or SPECTATOR """
+        game = self._games[game_id]
+        view = game.views.get(viewer)
+        if view is not None:
+            self.hits += 1
+            return view
+
+        self.misses += 1
+        if game.table is None:
+            game.table = _encode(public_state(game.round))
+
+        parts = [b'{']
+        if viewer != SPECTATOR:
+            if not 0 <= viewer < game.round.player_count:
+                raise ValueError("%r is not a seat" % (viewer,))
+            if game.hands[viewer] is None:
+                game.hands[viewer] = _encode(format_cards(
+                    game.round.hands[viewer]))
+            parts.extend([b'"hand":', game.hands[viewer], b','])
+        parts.extend([b'"table":', game.table, b',"trump":', game.trump,
+                      b'}'])
+
+        view = b''.join(parts)
+        game.views[viewer] = view
+        return view
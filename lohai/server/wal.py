@@ -0,0 +1,301 @@
+""" Write-ahead log of game actions with group commit
+
+A game server applies an action to its Round, appends it to the log and
+acknowledges it once the log is durable.  Rather than fsyncing every action,
+the log collects the actions of all games arriving within max_delay of the
+first one into a batch, writes the batch in one go and fsyncs once; every
+action in the batch is acknowledged together.
+
+The log is a file of frames, each the payload length and its crc32 followed
+by a pickled record:
+
+    ('new', game_id, dump_round(round))     a game and its state
+    ('move', game_id, move)                 a move, see Round.apply_moves
+
+A crash can leave a partially written frame at the end of the file, which
+is ignored on reading and cut off before the log is appended to again.
+recover() rebuilds the games by loading each game's latest state and
+replaying its moves after it.  A logged move that doesn't replay means the
+log and the engine disagree: that game is not recovered, and recover()
+raises RecoveryError once the other games are rebuilt.  checkpoint() replaces the log with the
+current state of every game so that it doesn't grow without bound.
+"""
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from lohai.exception import IllegalMove
+from lohai.server.shard import dump_round, load_round
+
+
+_HEADER = struct.Struct('>II')
+
+
+def _frame(record):
+    payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload), zlib.crc32(payload) & 0xffffffff) + \
+        payload
+
+
+def _read_frames(data):
+    """ Yield (end offset, record) for every intact frame of data """
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if (len(payload) < length
+                or zlib.crc32(payload) & 0xffffffff != crc):
+            return
+        offset = start + length
+        yield offset, pickle.loads(payload)
+
+
+def read_log(path):
+    """ The records of a log, up to any torn or corrupt frame """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as log:
+        data = log.read()
+    return [record for _offset, record in _read_frames(data)]
+
+
+def _intact_length(path):
+    with open(path, 'rb') as log:
+        data = log.read()
+    end = 0
+    for end, _record in _read_frames(data):
+        pass
+    return end
+
+
+class RecoveryError(ValueError):
+    """ Games whose logged moves could not be replayed
+
+    games holds the games that were recovered intact and failures, for each
+    failed game id, (record index, move, reason) of its first bad record.
+    """
+    def __init__(self, games, failures):
+        super(RecoveryError, self).__init__(
+            "%d games could not be recovered: %s"
+            % (len(failures), ', '.join(
+                '%s at record %d (%s)' % (game_id, index, reason)
+                for game_id, (index, _move, reason)
+                in sorted(failures.items(), key=lambda item: item[1][0]))))
+        self.games = games
+        self.failures = failures
+
+
+def recover(path):
+    """ Rebuild the logged games as a dict of game id to Round
+
+    Raises RecoveryError if any game fails to replay: a move that is
+    illegal for its game, or a move for a game whose state was never
+    logged.  A later state record for a failed game recovers it again.
+    """
+    games = {}
+    failures = {}
+    for index, (kind, game_id, data) in enumerate(read_log(path)):
+        if kind == 'new':
+            games[game_id] = load_round(data)
+            failures.pop(game_id, None)
+        elif kind == 'move' and game_id not in failures:
+            if game_id not in games:
+                failures[game_id] = (index, data, "no state logged")
+                continue
+            try:
+                games[game_id].apply_moves([data], notify=False)
+            except IllegalMove as exc:
+                failures[game_id] = (index, data, exc.reason)
+                del games[game_id]
+
+    if failures:
+        raise RecoveryError(games, failures)
+    return games
+
+
+class Commit(object):
+    """ The acknowledgement of a batch of records """
+    __slots__ = ['_done', 'error']
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.error = None
+
+    def _finish(self, error=None):
+        self.error = error
+        self._done.set()
+
+    @property
+    def durable(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        """ Block until the batch is durable, re-raising a failed write
+
+        Returns False if the timeout expired first.
+        """
+        if not self._done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+class WriteAheadLog(object):
+    """ An append-only log of game records flushed in group commits
+
+    max_delay is how long, in seconds, a batch stays open after its first
+    record, and a batch is flushed early once it holds max_batch_bytes.
+    Appending is thread safe; the writes and fsyncs happen on a background
+    thread so appenders only wait on the Commit they are handed.
+    """
+    def __init__(self, path, max_delay=0.002, max_batch_bytes=1 << 20,
+                 fsync=os.fsync):
+        self.path = path
+        self.max_delay = max_delay
+        self.max_batch_bytes = max_batch_bytes
+        self.fsync = fsync
+        self.batches = 0
+        self.records = 0
+
+        if os.path.exists(path):
+            intact = _intact_length(path)
+            with open(path, 'r+b') as log:
+                log.truncate(intact)
+        self._file = open(path, 'ab')
+
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = bytearray()
+        self._commit = Commit()
+        self._opened = None
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run,
+                                        name='lohai-wal-%s' % path)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, record):
+        """ Queue a record, returning the Commit that acknowledges it """
+        frame = _frame(record)
+        with self._condition:
+            if self._closed:
+                raise ValueError("Write-ahead log %s is closed" % self.path)
+
+            if not self._pending:
+                self._opened = time.time()
+                self._condition.notify()
+            self._pending.extend(frame)
+            self.records += 1
+            if len(self._pending) >= self.max_batch_bytes:
+                self._condition.notify()
+            return self._commit
+
+    def log_new_game(self, game_id, round):
+        return self.append(('new', game_id, dump_round(round)))
+
+    def log_move(self, game_id, move):
+        return self.append(('move', game_id, tuple(move)))
+
+    def _take_batch(self):
+        """ Wait for a batch to fill or time out, None once closed """
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+
+            deadline = self._opened + self.max_delay
+            while (not self._closed
+                   and len(self._pending) < self.max_batch_bytes):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch, commit = self._pending, self._commit
+            self._pending = bytearray()
+            self._commit = Commit()
+            # taken under the condition so batches are written in order
+            self._write_lock.acquire()
+            return batch, commit
+
+    def _write(self, data):
+        self._file.write(data)
+        self._file.flush()
+        self.fsync(self._file.fileno())
+        self.batches += 1
+
+    def _run(self):
+        while True:
+            taken = self._take_batch()
+            if taken is None:
+                return
+
+            batch, commit = taken
+            try:
+                self._write(batch)
+            except Exception as exc:  # pylint: disable=W0703
+                commit._finish(exc)  # pylint: disable=W0212
+            else:
+                commit._finish()  # pylint: disable=W0212
+            finally:
+                self._write_lock.release()
+
+    def _sync_directory(self):
+        # the rename is only durable once the directory is
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)),
+                            os.O_RDONLY)
+        try:
+            self.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def checkpoint(self, games):
+        """ Replace the log with the state of games, a dict of game id to
+        Round
+
+        games must include every move logged so far.  Records appended but
+        not yet written are covered by the checkpoint and acknowledged with
+        it.
+        """
+        temp_path = self.path + '.checkpoint'
+        with self._condition:
+            with self._write_lock:
+                with open(temp_path, 'wb') as temp:
+                    for game_id, round in games.items():
+                        temp.write(_frame(('new', game_id,
+                                           dump_round(round))))
+                    temp.flush()
+                    self.fsync(temp.fileno())
+
+                self._file.close()
+                os.rename(temp_path, self.path)
+                self._sync_directory()
+                self._file = open(self.path, 'ab')
+                self.batches += 1
+
+                commit, self._commit = self._commit, Commit()
+                del self._pending[:]
+                commit._finish()  # pylint: disable=W0212
+
+    def close(self):
+        """ Flush any pending records and stop the writer """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._file.close()
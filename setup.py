@@ -7,5 +7,5 @@ setup(name='lohai',
       description='Lohai card game',
       author='Mark Gius',
       author_email='mgius7096@gmail.com',
-      packages=['lohai'],
+      packages=['lohai', 'lohai.analysis', 'lohai.game', 'lohai.server'],
      )
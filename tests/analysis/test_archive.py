@@ -0,0 +1,118 @@
+# pylint: disable=W0621
+
+import json
+import os
+
+import pytest
+
+from lohai.analysis.archive import (ArchiveReader, ArchiveWriter, COLUMNS,
+                                    FORMAT_VERSION, NO_PLAYER, NO_SUIT)
+from lohai.game.deck import (Card, CardValue, Deck, NO_CARD, SpecialCard, Suit,
+                             card_from_code, decode_cards)
+from lohai.game.round import Round
+
+
+@pytest.fixture()
+def played_round():
+    hands = [[Card(CardValue.three, Suit.club)],
+             [SpecialCard(CardValue.taker)],
+             [Card(CardValue.four, Suit.club)],
+             [Card(CardValue.two, Suit.heart)]]
+    round = Round(Deck([]), hands, Card(CardValue.king, Suit.heart))
+    for player, hand in enumerate(round.dealt_hands):
+        round.play_card(player, hand[0])
+    return round
+
+
+def test_round_trip(tmpdir, played_round):
+    path = str(tmpdir.join('archive'))
+    with ArchiveWriter(path) as writer:
+        writer.append(played_round)
+        writer.append(played_round)
+
+    with ArchiveReader(path) as reader:
+        assert 2 == len(reader)
+
+        row = reader[1]
+        assert [1, NO_PLAYER] == list(row['winners'][:2])
+        assert [0, 1, 0, 0] == list(row['tricks_won'])
+        assert played_round.trump_card == card_from_code(row['trump'][0])
+        assert (list(played_round.trick_history[0].field_cards)
+                == decode_cards(row['fields'][:4]))
+        assert [0, 4, 0, 0] == list(row['specials'][:4])
+        assert [Suit.club, NO_SUIT] == list(row['leads'][:2])
+        assert [NO_CARD] * 8 == list(row['deal'][1:9])
+
+        deal = reader.column('deal')
+        assert (2, 36) == deal.shape
+        assert played_round.dealt_hands[3][0].code == deal[1, 27]
+        deal.release()
+
+
+def test_append_reopens_archive(tmpdir, played_round):
+    path = str(tmpdir.join('archive'))
+    with ArchiveWriter(path) as writer:
+        writer.append(played_round)
+    with ArchiveWriter(path, buffer_rounds=1) as writer:
+        writer.append(played_round)
+
+    with ArchiveReader(path) as reader:
+        assert 2 == len(reader)
+
+
+def test_torn_round_ignored(tmpdir, played_round):
+    path = str(tmpdir.join('archive'))
+    with ArchiveWriter(path) as writer:
+        writer.append(played_round)
+
+    # simulate a crash part way through writing the second round
+    with open(os.path.join(path, COLUMNS[0][0] + '.u8'), 'ab') as column:
+        column.write(b'\x00' * 10)
+
+    with ArchiveReader(path) as reader:
+        assert 1 == len(reader)
+        with pytest.raises(IndexError):
+            reader[1]  # pylint: disable=W0104
+
+
+def test_append_after_torn_round(tmpdir, played_round):
+    path = str(tmpdir.join('archive'))
+    with ArchiveWriter(path) as writer:
+        writer.append(played_round)
+
+    # a crash after the deal of a second round was written
+    with open(os.path.join(path, 'deal.u8'), 'ab') as column:
+        column.write(b'\x00' * 36)
+
+    other = Round(Deck([]), [[Card(CardValue.five, Suit.spade)]] * 4,
+                  Card(CardValue.two, Suit.club))
+    with ArchiveWriter(path) as writer:
+        writer.append(other)
+
+    with ArchiveReader(path) as reader:
+        assert 2 == len(reader)
+        row = reader[1]
+        assert other.trump_card == card_from_code(bytearray(row['trump'])[0])
+        assert Card(CardValue.five, Suit.spade) == \
+            card_from_code(bytearray(row['deal'])[0])
+
+
+def test_empty_archive(tmpdir):
+    path = str(tmpdir.join('archive'))
+    ArchiveWriter(path).close()
+
+    with ArchiveReader(path) as reader:
+        assert 0 == len(reader)
+        assert 0 == len(reader.column('tricks_won'))
+
+
+def test_older_version_rejected(tmpdir):
+    path = str(tmpdir.join('archive'))
+    ArchiveWriter(path).close()
+    with open(os.path.join(path, 'meta.json'), 'w') as meta:
+        json.dump({'version': 1, 'columns': COLUMNS[:-2]}, meta)
+
+    with pytest.raises(ValueError) as error:
+        ArchiveReader(path)
+    assert ('a version 1 archive, expected version %d' % FORMAT_VERSION
+            in str(error.value))
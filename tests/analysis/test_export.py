@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from lohai.analysis.export import (ACTION_COUNT, RECORD_SIZE,
+                                   DecisionRecorder, ShardWriter,
+                                   action_index, decode_record,
+                                   export_rounds, export_self_play,
+                                   iter_records, read_shard, shard_paths)
+from lohai.game.deck import Card, CardValue, SpecialCard, Suit
+from lohai.game.round import MOVE_ACTIONS
+from lohai.game.simulate import random_policy
+
+
+@pytest.fixture()
+def path(tmpdir):
+    return str(tmpdir.join('decisions'))
+
+
+def test_action_indices_are_distinct():
+    moves = [('play_card', 0, SpecialCard(value))
+             for value in CardValue.special_values()]
+    moves.extend(('play_card', 0, Card(value, suit))
+                 for value in CardValue.number_values()
+                 for suit in Suit.all_suits())
+    moves.extend(('handle_shaker', 0, victim) for victim in range(4))
+    moves.extend(('handle_mover', 0, source, dest)
+                 for source in range(4) for dest in range(4)
+                 if source != dest)
+    moves.extend(('handle_giver', 0, victim) for victim in range(4))
+
+    indices = [action_index(move) for move in moves]
+    assert sorted(indices) == list(range(ACTION_COUNT))
+
+
+def test_records_match_decisions(path):
+    seen = []
+
+    def watching_policy(round, player, moves, rng):
+        move = random_policy(round, player, moves, rng)
+        seen.append((player, sorted(action_index(legal) for legal in moves),
+                     action_index(move), len(round.hands[player])))
+        return move
+
+    with ShardWriter(path, 'test') as writer:
+        recorder = DecisionRecorder(writer)
+        round = recorder.play_round([watching_policy] * 4, random.Random(4))
+
+    records = [decode_record(record) for record in iter_records(path)]
+    assert len(seen) == len(records)
+    lo, hai = round.lo_hai()
+    for (player, legal, action, hand_size), record in zip(seen, records):
+        assert player == record['seat']
+        assert legal == record['legal']
+        assert action == record['action']
+        assert hand_size == len(record['hand'])
+        assert round.trump_card.code == record['trump']
+        assert round.tricks_won[player] == record['final']
+        assert ((player == lo) | (player == hai) << 1) == record['scoring']
+        assert record['kind'] < len(MOVE_ACTIONS)
+
+
+def test_shards_rotate(path):
+    records = export_rounds(path, 'test', 1, 5, records_per_shard=50)
+
+    shards = shard_paths(path)
+    assert (records + 49) // 50 == len(shards)
+    assert all(50 * RECORD_SIZE == len(read_shard(shard))
+               for shard in shards[:-1])
+    assert records == len(list(iter_records(path)))
+
+
+def test_partial_records_are_refused(path):
+    with ShardWriter(path, 'test') as writer:
+        with pytest.raises(ValueError):
+            writer.write(bytearray(RECORD_SIZE + 1))
+
+
+def test_export_self_play(path):
+    records = export_self_play(path, 6, chunk_rounds=2, processes=2)
+
+    assert records == len(list(iter_records(path)))
+    assert 3 == len(shard_paths(path))
+
+
+def test_first_decision_is_legal(path):
+    export_rounds(path, 'test', 2, 1)
+    record = decode_record(next(iter_records(path)))
+    assert record['action'] in record['legal']
+    assert 9 == len(record['hand'])
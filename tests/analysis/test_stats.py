@@ -0,0 +1,140 @@
+# pylint: disable=W0621
+
+import random
+
+import pytest
+
+from lohai.analysis.archive import ArchiveReader, ArchiveWriter
+from lohai.analysis.stats import (Proportion, RoundStats, parallel_stats,
+                                  simulate_rounds)
+from lohai.game.deck import Card, CardValue, Deck, SpecialCard, Suit
+from lohai.game.round import Round
+from lohai.game.simulate import play_round, random_policy
+
+
+@pytest.fixture()
+def rounds():
+    rng = random.Random(7)
+    return [play_round([random_policy] * 4, rng) for _i in range(20)]
+
+
+def _stats_for(rounds):
+    stats = RoundStats()
+    for round in rounds:
+        stats.observe_round(round)
+    return stats
+
+
+def _state(stats):
+    return (stats.rounds, stats.by_trump_suit, stats.by_trump_value,
+            stats.specials, stats.tricks_won)
+
+
+def test_proportion_interval():
+    proportion = Proportion()
+    assert (0.0, 1.0) == proportion.interval()
+
+    for success in [True] * 40 + [False] * 60:
+        proportion.add(success)
+
+    low, high = proportion.interval()
+    assert 0.4 == proportion.rate
+    assert low < 0.4 < high
+    assert 0.09 < proportion.half_width() < 0.1
+
+
+def test_observe_round():
+    hands = [[Card(CardValue.three, Suit.club)],
+             [SpecialCard(CardValue.taker)],
+             [Card(CardValue.four, Suit.club)],
+             [Card(CardValue.two, Suit.heart)]]
+    round = Round(Deck([]), hands, Card(CardValue.king, Suit.heart))
+    for player, hand in enumerate(round.dealt_hands):
+        round.play_card(player, hand[0])
+
+    stats = _stats_for([round])
+
+    assert 1 == stats.rounds
+    assert {0: 3, 1: 1} == stats.tricks_won
+    # player 1 has the Hai, the Lo is tied
+    assert ([Proportion(0, 1), Proportion(1, 1), Proportion(0, 1),
+             Proportion(0, 1)] == stats.by_trump_suit[Suit.heart])
+    # the trump two would have won without the taker
+    assert Proportion(1, 1) == stats.specials[CardValue.taker]
+    assert Proportion(0, 0) == stats.specials[CardValue.giver]
+
+
+def test_observe_shaker_steal():
+    hands = [[Card(CardValue.three, Suit.heart)],
+             [Card(CardValue.four, Suit.heart)],
+             [SpecialCard(CardValue.shaker)],
+             [Card(CardValue.two, Suit.club)]]
+    round = Round(Deck([Card(CardValue.two, Suit.heart)]), hands,
+                  Card(CardValue.king, Suit.heart))
+    round.play_card(0, Card(CardValue.three, Suit.heart))
+    round.play_card(1, Card(CardValue.four, Suit.heart))
+    round.play_card(2, SpecialCard(CardValue.shaker))
+    round.handle_shaker(2, 1)
+    round.play_card(3, Card(CardValue.two, Suit.club))
+
+    assert ((CardValue.shaker, 1),) == round.trick_history[0].displaced
+
+    stats = _stats_for([round])
+
+    # the second player led before the steal, the thief won the trick
+    assert [0, 0, 1, 0] == round.tricks_won
+    assert Proportion(1, 1) == stats.specials[CardValue.shaker]
+
+
+def test_observe_mover_draw():
+    hands = [[Card(CardValue.nine, Suit.club)],
+             [Card(CardValue.two, Suit.club)],
+             [Card(CardValue.four, Suit.club)],
+             [SpecialCard(CardValue.mover)]]
+    round = Round(Deck([Card(CardValue.three, Suit.club)]), hands,
+                  Card(CardValue.king, Suit.heart))
+    for player, hand in enumerate(round.dealt_hands):
+        round.play_card(player, hand[0])
+
+    stats = _stats_for([round])
+
+    # the mover could not be used and its draw did not change the winner
+    assert ((CardValue.mover, 0),) == round.trick_history[0].displaced
+    assert Proportion(0, 1) == stats.specials[CardValue.mover]
+
+
+def test_merge(rounds):
+    merged = _stats_for(rounds[:5])
+    merged.merge(_stats_for(rounds[5:]))
+
+    assert _state(_stats_for(rounds)) == _state(merged)
+    assert 9 * 20 == sum(count * occurrences for count, occurrences
+                             in merged.tricks_won.items())
+
+
+def test_observe_archive(tmpdir, rounds):
+    path = str(tmpdir.join('archive'))
+    with ArchiveWriter(path) as writer:
+        for round in rounds:
+            writer.append(round)
+
+    stats = RoundStats()
+    with ArchiveReader(path) as reader:
+        stats.observe_archive(reader)
+
+    assert _state(_stats_for(rounds)) == _state(stats)
+
+
+def test_simulate_rounds_is_seeded():
+    assert _state(simulate_rounds(3, 10)) == _state(simulate_rounds(3, 10))
+
+
+def test_parallel_stats_stops_early():
+    stats = parallel_stats(half_width=0.5, max_rounds=1000, chunk_rounds=50,
+                           processes=2)
+    assert stats.converged(0.5)
+    assert stats.rounds < 1000
+
+    stats = parallel_stats(half_width=0.0, max_rounds=120, chunk_rounds=50,
+                           processes=2)
+    assert 120 == stats.rounds
@@ -0,0 +1,75 @@
+import pytest
+
+from lohai.analysis.tournament import (MatchResult, SEATINGS, play_deal,
+                                       play_deals, run_match)
+from lohai.game.simulate import random_policy
+
+
+def lowest_card_policy(round, player, moves, rng):  # pylint: disable=W0613
+    def _key(move):
+        if move[0] != 'play_card' or move[2].is_special:
+            return 1000
+        if move[2].suit == round.trump_suit:
+            return 200 + move[2].value
+        return move[2].value
+
+    return min(moves, key=_key)
+
+
+def test_seatings_play_every_hand():
+    for seat in range(4):
+        assert set([0, 1]) == set(seating[seat] for seating in SEATINGS)
+
+
+def test_play_deal_is_duplicate():
+    wins, seat_games = play_deal('deal', [random_policy, random_policy])
+
+    assert [4, 4] == seat_games
+    assert (wins, seat_games) == play_deal('deal', [random_policy,
+                                                    random_policy])
+
+
+def test_match_result_significance():
+    result = MatchResult()
+    for _i in range(10):
+        result.add_deal([2, 1], [4, 4])
+        result.add_deal([2, 2], [4, 4])
+
+    assert pytest.approx(0.125) == result.mean_difference
+    assert result.z_score() > 3
+    assert not result.significant(min_deals=30)
+    assert result.significant(min_deals=20)
+
+    merged = MatchResult()
+    merged.merge(result)
+    merged.merge(result)
+    assert 40 == merged.deals
+    assert result.win_rate(0) == merged.win_rate(0)
+    assert merged.z_score() > result.z_score()
+
+
+def test_match_result_zero_variance():
+    result = MatchResult()
+    for _i in range(2):
+        result.add_deal([3, 2], [4, 4])
+
+    assert 0 < result.z_score() < float('inf')
+    assert not result.significant(min_deals=2)
+
+
+def test_run_match_to_max_deals():
+    result = run_match([random_policy, random_policy], max_deals=12,
+                       chunk_deals=5, processes=2)
+
+    assert 12 == result.deals
+    serial = play_deals(['0:%d' % deal for deal in range(12)],
+                        [random_policy, random_policy])
+    assert serial.wins == result.wins
+
+
+def test_run_match_stops_when_significant():
+    result = run_match([lowest_card_policy, random_policy], max_deals=400,
+                       chunk_deals=10, processes=2, z=0.5, min_deals=10)
+
+    assert result.deals < 400
+    assert result.significant(0.5, 10)
@@ -1,6 +1,9 @@
+import pickle
+
 import pytest
 
-from lohai.game.deck import Card, CardValue, SpecialCard, Suit
+from lohai.game.deck import (Card, CardValue, Deck, NO_CARD, SpecialCard, Suit,
+                             card_from_code, decode_cards, encode_cards)
 
 
 def test_special_card_is_special(special_card):
@@ -56,3 +59,51 @@ def test_coverage_str_repr(special_card):
     # clear coverage for __str__ and __repr__ debugging helpers
     repr(special_card)
     str(special_card)
+
+
+def test_card_codes_round_trip(clean_deck):
+    codes = encode_cards(clean_deck.cards)
+    assert 52 == len(codes)
+    assert clean_deck.cards == decode_cards(codes)
+
+    for card in clean_deck.cards:
+        assert card == card_from_code(card.code)
+
+
+def test_encode_cards_padding():
+    codes = encode_cards([Card(CardValue.two, Suit.club), None], width=4)
+    assert [Card(CardValue.two, Suit.club).code, NO_CARD, NO_CARD,
+            NO_CARD] == list(codes)
+
+    with pytest.raises(ValueError):
+        encode_cards(Deck.shuffle_new_deck().cards, width=4)
+
+    with pytest.raises(ValueError):
+        card_from_code(0x4f)
+
+
+def test_cards_are_slotted(clean_deck):
+    for card in clean_deck.cards:
+        assert not hasattr(card, '__dict__')
+    assert not hasattr(clean_deck, '__dict__')
+
+
+def test_cards_are_shared(clean_deck):
+    """ Decks and unpickled cards share one instance per card """
+    other = pickle.loads(pickle.dumps(Deck.shuffle_new_deck()))
+
+    cards = dict((card.code, card) for card in clean_deck.cards)
+    for card in other.cards:
+        assert cards[card.code] is card
+
+
+def test_value_lists_are_copies():
+    values = CardValue.number_values()
+    values.pop()
+    suits = Suit.all_suits()
+    suits.append(Suit.none)
+
+    assert 11 == len(CardValue.number_values())
+    assert [Suit.heart, Suit.diamond, Suit.spade, Suit.club] == \
+        Suit.all_suits()
+    assert 52 == len(Deck.shuffle_new_deck().cards)
@@ -0,0 +1,78 @@
+from collections import Counter
+import random
+
+import pytest
+
+from lohai.game.deck import Card, CardValue, SpecialCard, Suit
+from lohai.game.draws import DrawKnowledge
+from lohai.game.round import Round
+from lohai.game.simulate import legal_moves
+
+
+def _hidden(round, player):
+    """ What player can't see: the other hands and the deck """
+    hidden = Counter(card.code for card in round.deck.cards)
+    for other, cards in enumerate(round.hands):
+        if other != player:
+            hidden.update(card.code for card in cards)
+    return hidden
+
+
+def test_unseen_cards_follow_play():
+    rng = random.Random(3)
+    for seed in range(10):
+        round = Round.start_new_round(random.Random(seed))
+        knowledge = [DrawKnowledge(round, player) for player in range(4)]
+        moves = legal_moves(round)
+        while moves:
+            round.apply_moves([rng.choice(moves)])
+            for player in range(4):
+                assert _hidden(round, player) == knowledge[player].unseen()
+            moves = legal_moves(round)
+
+
+def test_draw_distribution(round):
+    distribution = DrawKnowledge(round, 0).draw_distribution()
+
+    assert 1 == pytest.approx(sum(distribution.values()))
+    # 42 unseen cards, one copy of the deck's top card among them
+    assert 1.0 / 42 == pytest.approx(
+        distribution[Card(CardValue.jack, Suit.club)])
+    # player 0 holds one of the two takers
+    assert 1.0 / 42 == pytest.approx(
+        distribution[SpecialCard(CardValue.taker)])
+    assert Card(CardValue.three, Suit.spade) not in distribution
+
+
+def test_mover_outcomes(round):
+    round.current_hand.cur_player = 3
+    round.tricks_won = [0, 2, 2, 1]
+    round.play_card(3, SpecialCard(CardValue.mover))
+
+    knowledge = DrawKnowledge(round, 3)
+    outcomes = knowledge.mover_outcomes(3)
+
+    assert 1 == pytest.approx(sum(outcomes.values()))
+    # alone on the field, any card but a shaker or mover leads
+    distribution = knowledge.draw_distribution()
+    redraw = sum(chance for card, chance in distribution.items()
+                 if card.value in (CardValue.shaker, CardValue.mover))
+    assert redraw == pytest.approx(outcomes[None])
+    assert 1 - redraw == pytest.approx(outcomes[3])
+    assert outcomes is knowledge.mover_outcomes(3)
+
+
+def test_shaker_outcomes(round):
+    round.play_card(0, Card(CardValue.king, Suit.spade))
+    round.play_card(1, SpecialCard(CardValue.shaker))
+
+    knowledge = DrawKnowledge(round, 1)
+    outcomes = knowledge.shaker_outcomes(1, 0)
+
+    assert 1 == pytest.approx(sum(outcomes.values()))
+    # the stolen king leads unless player 0 draws a trump, or the taker
+    # or giver
+    assert outcomes[1] > outcomes[0] > 0
+
+    with pytest.raises(ValueError):
+        knowledge.shaker_outcomes(1, 2)
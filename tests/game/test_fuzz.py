@@ -0,0 +1,69 @@
+import pytest
+
+from lohai.game.fuzz import (InvariantError, check_invariants, fuzz,
+                             fuzz_games, play_game, shrink)
+from lohai.game.round import Round
+
+
+@pytest.fixture()
+def duplicating_draws(monkeypatch):
+    """ Replacement draws that leave the card on the deck """
+    monkeypatch.setattr(Round, 'draw_card', lambda self: self.deck.cards[0])
+
+
+def test_random_games_keep_invariants():
+    assert [] == fuzz_games(['test:%d' % game for game in range(50)])
+
+
+def test_replay_choices():
+    choices, moves, error = play_game('replay')
+    assert error is None
+
+    assert (choices, moves, None) == play_game('replay', choices)
+    assert (choices[:5], moves[:5], None) == play_game('replay', choices[:5])
+
+
+def test_check_invariants_cards(round):
+    check_invariants(round)
+
+    round.hands[0].pop()
+    with pytest.raises(InvariantError):
+        check_invariants(round)
+
+
+def test_check_invariants_tricks(round):
+    round.tricks_won[1] += 1
+    with pytest.raises(InvariantError):
+        check_invariants(round)
+
+
+def test_check_invariants_turn(round):
+    round.current_hand.cur_player = 2
+    with pytest.raises(InvariantError):
+        check_invariants(round)
+
+
+def test_failures_are_shrunk(duplicating_draws):  # pylint: disable=W0613
+    failures = fuzz_games(['shrink:%d' % game for game in range(20)])
+    assert failures
+
+    failure = failures[0]
+    shrunk = shrink(failure)
+
+    assert failure.seed == shrunk.seed
+    assert 'Cards not conserved' in shrunk.error
+    assert len(shrunk.choices) <= len(failure.choices)
+    assert sum(shrunk.choices) <= sum(failure.choices)
+    assert play_game(shrunk.seed, shrunk.choices)[2] is not None
+
+    # no single deletion or zeroing fails any more
+    for step in range(len(shrunk.choices)):
+        deleted = shrunk.choices[:step] + shrunk.choices[step + 1:]
+        assert play_game(shrunk.seed, deleted)[2] is None
+        if shrunk.choices[step]:
+            zeroed = shrunk.choices[:step] + [0] + shrunk.choices[step + 1:]
+            assert play_game(shrunk.seed, zeroed)[2] is None
+
+
+def test_fuzz_pool():
+    assert [] == fuzz(20, chunk_games=5, processes=2)
@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from lohai.game.deck import (Card, CardValue, Deck, NO_CARD, SpecialCard, Suit,
+                             encode_cards)
+from lohai.game.notation import (code_from_notation, format_card,
+                                 format_cards, format_codes, format_move,
+                                 format_moves, notation_from_code, parse_card,
+                                 parse_cards, parse_codes, parse_move,
+                                 parse_moves)
+from lohai.game.simulate import legal_moves
+from lohai.game.round import Round
+
+
+def test_card_notation():
+    assert 'JD' == format_card(Card(CardValue.jack, Suit.diamond))
+    assert '9S' == format_card(Card(CardValue.nine, Suit.spade))
+    assert 'Tk' == format_card(SpecialCard(CardValue.taker))
+    assert 'Gv' == format_card(SpecialCard(CardValue.giver))
+    assert '--' == format_card(None)
+
+    assert Card(CardValue.two, Suit.heart) == parse_card('2H')
+    assert parse_card('Mv') is parse_card('Mv')
+    assert parse_card('--') is None
+
+
+def test_every_card_round_trips():
+    cards = set(Deck.shuffle_new_deck().cards)
+    for card in cards:
+        notation = format_card(card)
+        assert 2 == len(notation)
+        assert card is parse_card(notation)
+        assert notation == notation_from_code(card.code)
+        assert card.code == code_from_notation(notation)
+
+
+def test_bulk_cards():
+    cards = Deck.shuffle_new_deck(random.Random(1)).cards
+    text = format_cards(cards)
+
+    assert 2 * len(cards) == len(text)
+    assert cards == parse_cards(text)
+    assert encode_cards(cards) == parse_codes(text)
+    assert text == format_codes(encode_cards(cards))
+    assert [None, SpecialCard(CardValue.shaker)] == parse_cards('--Sh')
+
+
+@pytest.mark.parametrize('text', ['J', '1S', 'JX', 'sh', 'Tk9'])
+def test_parse_invalid_cards(text):
+    with pytest.raises(ValueError):
+        parse_codes(text)
+
+
+def test_format_invalid_codes():
+    with pytest.raises(ValueError):
+        format_codes(bytearray([0x0f]))
+    assert '--' == format_codes(bytearray([NO_CARD]))
+
+
+def test_move_notation():
+    moves = [('play_card', 0, Card(CardValue.jack, Suit.diamond)),
+             ('play_card', 1, SpecialCard(CardValue.shaker)),
+             ('handle_shaker', 1, 0),
+             ('handle_mover', 3, 2, 0),
+             ('handle_giver', 3, 1)]
+
+    text = format_moves(moves)
+    assert '0JD 1Sh 1s0 3m20 3g1' == text
+    assert moves == parse_moves(text)
+
+
+@pytest.mark.parametrize('text', ['', '0', 'xJD', '0--', '0s', '0s12',
+                                  '0m1', '0JDX', '0gx'])
+def test_parse_invalid_moves(text):
+    with pytest.raises(ValueError):
+        parse_move(text)
+
+
+def test_format_invalid_move():
+    with pytest.raises(ValueError):
+        format_move(('transfer_trick', 0, 1, 2))
+
+
+def test_replay_move_log():
+    rng = random.Random(7)
+    round = Round.start_new_round(random.Random(3))
+    played = []
+    moves = legal_moves(round)
+    while moves:
+        move = rng.choice(moves)
+        round.apply_moves([move])
+        played.append(move)
+        moves = legal_moves(round)
+
+    replay = Round.start_new_round(random.Random(3))
+    replay.apply_moves(parse_moves(format_moves(played)))
+
+    assert round.tricks_won == replay.tricks_won
+    assert round.trick_history == replay.trick_history
@@ -1,10 +1,17 @@
 # pylint: disable=R0201
 
+import os
+import pickle
+import random
+
 import pytest
 
+import lohai.events
 from lohai import exception
+from lohai.events import Events
 from lohai.game.deck import Card, CardValue, Deck, SpecialCard, Suit
-from lohai.game.round import CardPlayer, Round
+from lohai.game.round import CardPlayer, HandState, Round
+from lohai.game.simulate import legal_moves, play_round, random_policy
 
 
 class TestCanPlayCards(object):
@@ -145,6 +152,53 @@ class TestRound(object):
         for player in range(r.player_count):
             assert 9 == len(r.get_hand_for_player(player))
 
+    def test_state_objects_are_slotted(self, round):
+        assert not hasattr(round, '__dict__')
+        assert not hasattr(round.current_hand, '__dict__')
+
+    def test_hand_reused_between_tricks(self, round):
+        hand = round.current_hand
+        field_cards = hand.field_cards
+        round.apply_moves([('play_card', 0, Card(CardValue.three, Suit.spade)),
+                           ('play_card', 1, Card(CardValue.four, Suit.spade)),
+                           ('play_card', 2, Card(CardValue.five, Suit.spade)),
+                           ('play_card', 3, Card(CardValue.seven, Suit.club))])
+
+        assert hand is round.current_hand
+        assert field_cards is hand.field_cards
+        assert [None] * 4 == field_cards
+        assert 2 == hand.cur_player
+        assert Card(CardValue.three, Suit.spade) == \
+            round.trick_history[0].field_cards[0]
+
+    def test_pickle_round_trip(self, round):
+        round.play_card(0, Card(CardValue.three, Suit.spade))
+        loaded = pickle.loads(pickle.dumps(round, pickle.HIGHEST_PROTOCOL))
+
+        assert round.hands == loaded.hands
+        assert round.dealt_hands == loaded.dealt_hands
+        assert round.this_rounds_cards == loaded.this_rounds_cards
+        assert loaded is loaded.current_hand.round
+
+    def test_load_baseline_pickle(self):
+        """ Cards and Rounds pickled before __slots__ still load """
+        path = os.path.join(os.path.dirname(__file__), 'data',
+                            'baseline.pickle')
+        with open(path, 'rb') as data:
+            card, special, round = pickle.load(data)
+
+        assert Card(CardValue.nine, Suit.club) == card
+        assert SpecialCard(CardValue.mover) == special
+        assert Card(CardValue.three, Suit.spade) == round.this_rounds_cards[0]
+        assert [SpecialCard(CardValue.taker)] == round.hands[0]
+        assert [] == round.trick_history
+
+        # the loaded round plays on
+        round.play_card(1, Card(CardValue.four, Suit.spade))
+        round.play_card(2, Card(CardValue.five, Suit.spade))
+        round.play_card(3, Card(CardValue.two, Suit.heart))
+        assert [0, 0, 0, 1] == round.tricks_won
+
     def test_remove_card_from_hand_no_card(self, round):
         card = round.get_hand_for_player(1)[0]
         with pytest.raises(exception.InvalidCard):
@@ -285,6 +339,24 @@ class TestShaker(object):
 
         assert expected_field == round.this_rounds_cards
 
+    def test_shaker_input_state(self, hands, round):
+        round.play_card(0, hands[0][0])
+        round.play_card(1, hands[1][0])
+        round.play_card(2, hands[2][0])
+
+        hand = round.current_hand
+        assert HandState.shaker_input == hand.state
+        assert 2 == hand.next_player
+
+        # the victim draws the second shaker and steals straight back
+        round.handle_shaker(2, 1)
+        assert HandState.shaker_input == hand.state
+        assert 1 == hand.next_player
+
+        round.handle_shaker(1, 2)
+        assert HandState.playing == hand.state
+        assert 3 == hand.next_player
+
     def test_shaker_first(self, round, hands):
         """ a player who plyas a shaker first simply draws a new card from the
         top of the deck """
@@ -348,6 +420,14 @@ class TestMover(object):
 
         assert expected_field == round.this_rounds_cards
 
+    def test_mover_from_deck_passes_turn_once(self, round):
+        round.cur_player = 3
+        round.tricks_won = [0, 0, 0, 1]
+
+        round.play_card(3, SpecialCard(CardValue.mover))
+
+        assert 0 == round.current_hand.cur_player
+
     def test_mover_source_player_empty(self, round):
         round.current_hand.cur_player = 3
         round.tricks_won = [0, 2, 2, 1]
@@ -368,3 +448,165 @@ class TestMover(object):
 
         assert expected_tricks == round.tricks_won
         assert expected_field == round.this_rounds_cards
+
+    def test_mover_input_state(self, round):
+        round.current_hand.cur_player = 3
+        round.tricks_won = [0, 2, 2, 1]
+
+        round.play_card(3, SpecialCard(CardValue.mover))
+
+        hand = round.current_hand
+        assert HandState.mover_input == hand.state
+        assert 3 == hand.next_player
+        assert not hand.hand_complete()
+
+        # nobody plays on while the mover is pending
+        with pytest.raises(exception.InvalidMove):
+            round.play_card(0, Card(CardValue.three, Suit.spade))
+
+        round.handle_mover(3, 3, 0)
+        assert HandState.playing == hand.state
+        assert 0 == hand.next_player
+
+
+class TestHandState(object):
+    def test_playing(self, round):
+        hand = round.current_hand
+        assert HandState.playing == hand.state
+        assert 0 == hand.next_player
+
+        round.play_card(0, Card(CardValue.three, Suit.spade))
+        assert HandState.playing == hand.state
+        assert 1 == hand.next_player
+
+    def test_giver_input(self, round):
+        round.apply_moves([('play_card', 0, SpecialCard(CardValue.taker)),
+                           ('play_card', 1, Card(CardValue.four, Suit.spade)),
+                           ('play_card', 2, Card(CardValue.five, Suit.spade)),
+                           ('play_card', 3, SpecialCard(CardValue.giver))])
+
+        hand = round.current_hand
+        assert HandState.giver_input == hand.state
+        assert 3 == hand.next_player
+        assert hand.hand_complete()
+
+        round.handle_giver(3, 1)
+        assert HandState.playing == hand.state
+        assert 1 == hand.next_player
+
+    def test_complete_after_last_trick(self):
+        round = play_round([random_policy] * 4, random.Random(3))
+        hand = round.current_hand
+        assert round.is_complete()
+        assert HandState.complete == hand.state
+        assert hand.next_player is None
+        assert hand.hand_complete()
+        assert [] == legal_moves(round)
+
+        # as pickled before the state was kept at the end of the round
+        hand.state = HandState.playing
+        loaded = pickle.loads(pickle.dumps(round, pickle.HIGHEST_PROTOCOL))
+        assert HandState.complete == loaded.current_hand.state
+        assert loaded.current_hand.next_player is None
+
+    def test_state_survives_pickling(self, round):
+        round.current_hand.cur_player = 3
+        round.tricks_won = [0, 2, 2, 1]
+        round.play_card(3, SpecialCard(CardValue.mover))
+
+        loaded = pickle.loads(pickle.dumps(round, pickle.HIGHEST_PROTOCOL))
+
+        assert HandState.mover_input == loaded.current_hand.state
+        assert 3 == loaded.current_hand.next_player
+        loaded.handle_mover(3, 3, 0)
+        assert [1, 2, 2, 0] == loaded.tricks_won
+
+
+class TestApplyMoves(object):
+    @pytest.fixture()
+    def events(self):
+        events = []
+
+        def handler(game_id, player_id, event_type):
+            events.append((player_id, event_type))
+
+        lohai.events.add_handler(handler)
+        yield events
+        lohai.events.remove_handler(handler)
+
+    def test_apply_moves(self, round):
+        moves = [('play_card', 0, Card(CardValue.three, Suit.spade)),
+                 ('play_card', 1, Card(CardValue.four, Suit.spade)),
+                 ('play_card', 2, Card(CardValue.five, Suit.spade)),
+                 ('play_card', 3, Card(CardValue.seven, Suit.club)),
+                 # player 3 has no spades and trumps
+                 ('play_card', 2, Card(CardValue.eight, Suit.spade)),
+                 ('play_card', 3, Card(CardValue.four, Suit.heart)),
+                 ('play_card', 0, Card(CardValue.seven, Suit.spade)),
+                 ('play_card', 1, Card(CardValue.six, Suit.spade)),
+                 # player 0 wins with the eight of hearts
+                 ('play_card', 3, Card(CardValue.seven, Suit.heart)),
+                 ('play_card', 0, Card(CardValue.eight, Suit.heart)),
+                 ('play_card', 1, Card(CardValue.five, Suit.heart)),
+                 ('play_card', 2, Card(CardValue.two, Suit.heart))]
+
+        assert len(moves) == round.apply_moves(moves)
+        assert [1, 0, 1, 1] == round.tricks_won
+        assert 0 == round.current_hand.cur_player
+        assert [None] * 4 == round.this_rounds_cards
+
+    def test_apply_moves_stops_at_illegal_move(self, round):
+        moves = [('play_card', 0, Card(CardValue.three, Suit.spade)),
+                 ('play_card', 2, Card(CardValue.five, Suit.spade)),
+                 ('play_card', 1, Card(CardValue.four, Suit.spade))]
+
+        with pytest.raises(exception.IllegalMove) as exc:
+            round.apply_moves(moves)
+
+        assert 1 == exc.value.index
+        assert moves[1] == exc.value.move
+        assert isinstance(exc.value.reason, exception.NotYourTurn)
+        assert Card(CardValue.three, Suit.spade) == round.this_rounds_cards[0]
+        assert round.this_rounds_cards[1] is None
+
+    def test_apply_moves_unknown_action(self, round):
+        with pytest.raises(exception.IllegalMove) as exc:
+            round.apply_moves([('transfer_trick', 0, 1, 2)])
+
+        assert 0 == exc.value.index
+
+    @pytest.mark.parametrize('move', [(),
+                                      None,
+                                      ('play_card', 0),
+                                      ('play_card', 0, 'JD'),
+                                      ('handle_shaker', 0, 9),
+                                      ('handle_mover', 0, 1, -1),
+                                      ('handle_giver', 0, 1, 2),
+                                      (['play_card'], 0, None),
+                                      ('handle_shaker', 1, 0),
+                                      ('handle_mover', 1, 0, 2)])
+    def test_apply_moves_malformed(self, round, move):
+        moves = [('play_card', 0, Card(CardValue.three, Suit.spade)), move]
+
+        with pytest.raises(exception.IllegalMove) as exc:
+            round.apply_moves(moves)
+
+        assert 1 == exc.value.index
+        assert move == exc.value.move
+
+    @pytest.mark.parametrize('notify', [True, False])
+    def test_apply_moves_notify(self, round, events, notify):
+        moves = [('play_card', 0, SpecialCard(CardValue.taker)),
+                 ('play_card', 1, Card(CardValue.four, Suit.spade)),
+                 ('play_card', 2, Card(CardValue.five, Suit.spade)),
+                 ('play_card', 3, SpecialCard(CardValue.giver)),
+                 ('handle_giver', 3, 1)]
+
+        round.apply_moves(moves, notify=notify)
+
+        assert [0, 1, 0, 0] == round.tricks_won
+        assert round.notify
+        if notify:
+            assert [(3, Events.giver_input_needed)] == events
+        else:
+            assert [] == events
@@ -0,0 +1,48 @@
+# pylint: disable=R0201
+
+import random
+
+from lohai.game.deck import Card, CardValue, SpecialCard, Suit
+from lohai.game.round import lo_hai
+from lohai.game.simulate import legal_moves, play_round, random_policy
+
+
+def test_legal_moves_follow_suit(round):
+    round.play_card(0, Card(CardValue.three, Suit.spade))
+
+    # the second player must follow spades, or play their shaker
+    assert [('play_card', 1, Card(CardValue.four, Suit.spade)),
+            ('play_card', 1, Card(CardValue.six, Suit.spade)),
+            ('play_card', 1, Card(CardValue.nine, Suit.spade)),
+            ('play_card', 1, SpecialCard(CardValue.shaker))] == \
+        legal_moves(round)
+
+
+def test_legal_moves_pending_input(round):
+    round.play_card(0, SpecialCard(CardValue.taker))
+    round.play_card(1, SpecialCard(CardValue.shaker))
+
+    assert [('handle_shaker', 1, 0)] == legal_moves(round)
+
+    round.handle_shaker(1, 0)
+    # the first player drew the jack of clubs from the deck
+    round.play_card(2, Card(CardValue.six, Suit.club))
+    round.play_card(3, SpecialCard(CardValue.giver))
+
+    assert [('handle_giver', 3, 0), ('handle_giver', 3, 1),
+            ('handle_giver', 3, 2)] == legal_moves(round)
+
+
+def test_play_round():
+    round = play_round([random_policy] * 4, random.Random(1))
+
+    assert round.is_complete()
+    assert [] == legal_moves(round)
+    assert 9 == len(round.trick_history)
+    assert 9 == sum(round.tricks_won)
+
+
+def test_lo_hai():
+    assert (0, 3) == lo_hai([1, 2, 2, 4])
+    assert (None, 3) == lo_hai([1, 1, 2, 5])
+    assert (None, None) == lo_hai([2, 2, 2, 2])
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from lohai.game.deck import Card, CardValue, SpecialCard, Suit, encode_cards
+from lohai.game.round import Round
+from lohai.game.strength import HandEvaluator, hand_strength
+
+
+@pytest.fixture()
+def trump_card():
+    return Card(CardValue.two, Suit.heart)
+
+
+def _cards(suit, values):
+    return [Card(value, suit) for value in values]
+
+
+def test_trumps_are_stronger(trump_card):
+    values = [CardValue.king, CardValue.queen, CardValue.jack,
+              CardValue.nine, CardValue.eight, CardValue.seven,
+              CardValue.six, CardValue.five, CardValue.four]
+
+    trumps = hand_strength(_cards(Suit.heart, values), trump_card)
+    clubs = hand_strength(_cards(Suit.club, values), trump_card)
+
+    assert 0 < clubs < trumps < 9
+
+
+def test_special_cards(trump_card):
+    hand = _cards(Suit.club, [CardValue.two, CardValue.three,
+                              CardValue.four, CardValue.five,
+                              CardValue.six, CardValue.seven,
+                              CardValue.eight, CardValue.nine])
+
+    base = hand_strength(hand, trump_card)
+    giver = hand_strength(hand + [SpecialCard(CardValue.giver)], trump_card)
+    taker = hand_strength(hand + [SpecialCard(CardValue.taker)], trump_card)
+
+    # a giver gives its own trick away, but keeps it from the opponents
+    assert base < giver < taker
+
+
+def test_special_trump_card():
+    hand = _cards(Suit.club, [CardValue.king, CardValue.queen])
+    assert hand_strength(hand, SpecialCard(CardValue.mover)) > 0
+
+
+def test_evaluator_caches_by_sorted_hand(trump_card):
+    hand = Round.start_new_round(random.Random(1)).dealt_hands[0]
+    evaluator = HandEvaluator()
+
+    strength = evaluator.evaluate(hand, trump_card)
+    assert hand_strength(hand, trump_card) == strength
+    assert strength == evaluator.evaluate(list(reversed(hand)), trump_card)
+    assert (1, 1) == (evaluator.hits, evaluator.misses)
+
+    evaluator.evaluate(hand, Card(CardValue.two, Suit.club))
+    assert 2 == evaluator.misses
+
+
+def test_evaluator_is_bounded(trump_card):
+    evaluator = HandEvaluator(cache_size=2)
+    hands = Round.start_new_round(random.Random(1)).dealt_hands
+    for hand in hands:
+        evaluator.evaluate(hand, trump_card)
+
+    assert 2 == len(evaluator)
+    # the least recently used hands were evicted
+    evaluator.evaluate(hands[3], trump_card)
+    evaluator.evaluate(hands[0], trump_card)
+    assert 1 == evaluator.hits
+
+
+def test_evaluator_without_cache(trump_card):
+    evaluator = HandEvaluator(cache_size=0)
+    hand = Round.start_new_round(random.Random(1)).dealt_hands[0]
+    assert evaluator.evaluate(hand, trump_card) == evaluator.evaluate(
+        hand, trump_card)
+    assert (0, 2, 0) == (evaluator.hits, evaluator.misses, len(evaluator))
+
+
+def test_deal_strengths_add_up_to_the_tricks():
+    rng = random.Random(4)
+    totals = []
+    for _i in range(500):
+        round = Round.start_new_round(rng)
+        totals.append(sum(hand_strength(hand, round.trump_card)
+                          for hand in round.dealt_hands))
+
+    assert abs(sum(totals) / len(totals) - 9) < 1
+
+
+def test_evaluate_deals():
+    rng = random.Random(2)
+    rounds = [Round.start_new_round(rng) for _i in range(5)]
+    deals = bytearray()
+    trumps = bytearray()
+    for round in rounds:
+        for hand in round.dealt_hands:
+            deals.extend(encode_cards(hand))
+        trumps.append(round.trump_card.code)
+
+    strengths = HandEvaluator().evaluate_deals(deals, trumps)
+
+    assert [[hand_strength(hand, round.trump_card)
+             for hand in round.dealt_hands] for round in rounds] == strengths
+
+    with pytest.raises(ValueError):
+        HandEvaluator().evaluate_deals(deals, trumps[:-1])
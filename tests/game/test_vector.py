@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from lohai.game.round import Round
+from lohai.game.simulate import legal_moves
+
+numpy = pytest.importorskip('numpy')
+from lohai.game.vector import (NO_PLAYER, NO_SUIT,  # pylint: disable=C0413
+                               VectorRounds)
+
+
+def _reference(seed, choices):
+    round = Round.start_new_round(random.Random(seed))
+    round.notify = False
+    steps = 0
+    moves = legal_moves(round)
+    while moves:
+        move = moves[choices[steps] % len(moves)]
+        getattr(round, move[0])(*move[1:])
+        steps += 1
+        moves = legal_moves(round)
+    return round, steps
+
+
+def test_matches_reference_rounds():
+    seeds = ['vector:%d' % game for game in range(300)]
+    choices = numpy.random.default_rng(0).integers(0, 1 << 30,
+                                                   (len(seeds), 200))
+    rounds = VectorRounds.from_rounds(
+        [Round.start_new_round(random.Random(seed)) for seed in seeds])
+    rounds.play(choices)
+
+    for game, seed in enumerate(seeds):
+        round, steps = _reference(seed, choices[game])
+
+        assert steps == rounds.moves[game]
+        assert round.tricks_won == list(rounds.tricks_won[game])
+        for index, trick in enumerate(round.trick_history):
+            assert [card.code for card in trick.field_cards] == \
+                list(rounds.trick_fields[game, index])
+            assert (NO_SUIT if trick.lead_suit is None
+                    else trick.lead_suit) == rounds.trick_leads[game, index]
+            assert trick.winner == rounds.trick_winners[game, index]
+
+
+def test_deal_and_play():
+    rounds = VectorRounds.deal(500, numpy.random.default_rng(1))
+
+    # every card is dealt once, specials twice
+    cards = numpy.concatenate([rounds.hands.reshape(500, -1), rounds.decks,
+                               rounds.trumps[:, None]], axis=1)
+    assert (numpy.sort(cards, axis=1) == numpy.sort(cards[0])).all()
+
+    rounds.play(rng=numpy.random.default_rng(2))
+    assert not rounds.active().any()
+    assert (9 == rounds.tricks_won.sum(axis=1)).all()
+    assert (NO_PLAYER != rounds.trick_winners).all()
+
+
+def test_from_rounds_needs_fresh_rounds():
+    round = Round.start_new_round(random.Random(1))
+    round.apply_moves([legal_moves(round)[0]])
+    with pytest.raises(ValueError):
+        VectorRounds.from_rounds([round])
@@ -0,0 +1,82 @@
+import random
+import threading
+
+import pytest
+
+from lohai import exception
+from lohai.game.round import Round
+from lohai.game.simulate import random_policy
+from lohai.server.bots import DecisionBroker, per_request
+
+
+def _play_with_broker(broker, round):
+    decision = broker.submit(round)
+    while decision is not None:
+        assert decision.wait(5) in decision.moves
+        decision = broker.submit(round)
+
+
+def test_bots_play_whole_rounds():
+    calls = []
+    policy = per_request(random_policy, random.Random(1))
+
+    def batch_policy(requests):
+        calls.append(len(requests))
+        return policy(requests)
+
+    rounds = [Round.start_new_round(random.Random(seed))
+              for seed in range(20)]
+    with DecisionBroker(batch_policy, window=0.01) as broker:
+        threads = [threading.Thread(target=_play_with_broker,
+                                    args=(broker, round))
+                   for round in rounds]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert all(round.is_complete() for round in rounds)
+    assert sum(calls) == broker.decisions
+    # concurrent games were decided together
+    assert max(calls) > 1
+    assert broker.batches < broker.decisions
+
+
+def test_latency_cap_closes_batch_early():
+    with DecisionBroker(per_request(random_policy), window=30) as broker:
+        decision = broker.submit(Round.start_new_round(), latency_cap=0.01)
+        assert decision.wait(5) is not None
+        assert decision.latency < 5
+
+
+def test_policy_errors_reach_every_request():
+    def failing_policy(requests):
+        raise RuntimeError("no model loaded")
+
+    with DecisionBroker(failing_policy, window=0.01) as broker:
+        decisions = [broker.submit(Round.start_new_round())
+                     for _i in range(3)]
+        for decision in decisions:
+            with pytest.raises(RuntimeError):
+                decision.wait(5)
+
+
+def test_illegal_choice_is_reported():
+    def bad_policy(requests):
+        return [('handle_giver', 0, 1) for _request in requests]
+
+    with DecisionBroker(bad_policy, window=0.01) as broker:
+        decision = broker.submit(Round.start_new_round())
+        with pytest.raises(exception.IllegalMove):
+            decision.wait(5)
+
+
+def test_complete_round_and_closed_broker():
+    broker = DecisionBroker(per_request(random_policy))
+    round = Round.start_new_round()
+    _play_with_broker(broker, round)
+    assert broker.submit(round) is None
+
+    broker.close()
+    with pytest.raises(ValueError):
+        broker.submit(Round.start_new_round())
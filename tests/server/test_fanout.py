@@ -0,0 +1,104 @@
+import json
+import random
+
+import pytest
+
+from lohai.game.round import Round
+from lohai.game.simulate import legal_moves
+from lohai.server.fanout import SPECTATOR, TableFanout
+
+
+class Viewer(object):
+    def __init__(self):
+        self.updates = []
+
+    def __call__(self, update):
+        self.updates.append(update)
+
+    def view(self):
+        state = {}
+        for update in self.updates:
+            state.update(json.loads(update.decode('utf-8')))
+        state.pop('full')
+        return state
+
+
+@pytest.fixture()
+def table():
+    return TableFanout(Round.start_new_round(random.Random(5)))
+
+
+def _play(table, moves, rng):
+    for _i in range(moves):
+        move = rng.choice(legal_moves(table.round))
+        table.act(*move)
+
+
+def test_updates_rebuild_full_state(table):
+    viewers = dict((visibility, Viewer())
+                   for visibility in [SPECTATOR, 0, 1, 2, 3])
+    for visibility, viewer in viewers.items():
+        table.join(viewer, visibility)
+
+    _play(table, 20, random.Random(1))
+
+    for visibility, viewer in viewers.items():
+        full = json.loads(table.full_state(visibility).decode('utf-8'))
+        full.pop('full')
+        assert full == viewer.view()
+        assert 21 == len(viewer.updates)
+
+
+def test_visibility(table):
+    spectator = Viewer()
+    seat = Viewer()
+    table.join(spectator)
+    table.join(seat, 2)
+
+    assert 'hand' not in json.loads(spectator.updates[0].decode('utf-8'))
+    hand = json.loads(seat.updates[0].decode('utf-8'))['hand']
+    assert 18 == len(hand)
+
+
+def test_class_shares_one_payload(table):
+    spectators = [Viewer() for _i in range(100)]
+    for spectator in spectators:
+        table.join(spectator)
+    seats = [Viewer(), Viewer()]
+    table.join(seats[0], 0)
+    table.join(seats[1], 1)
+
+    player = table.round.current_hand.next_player
+    move = legal_moves(table.round)[0]
+    updates = table.act(*move)
+
+    assert all(spectator.updates[-1] is updates[SPECTATOR]
+               for spectator in spectators)
+    # the seat that played sees its hand shrink, the other shares the
+    # spectators' update
+    assert 0 == player
+    assert b'"hand"' in seats[0].updates[-1]
+    assert seats[1].updates[-1] is updates[SPECTATOR]
+
+
+def test_deltas_only_hold_changes(table):
+    spectator = Viewer()
+    table.join(spectator)
+    table.act(*legal_moves(table.round)[0])
+
+    update = json.loads(spectator.updates[-1].decode('utf-8'))
+    assert 'trump' not in update
+    assert 'tricks' not in update
+    assert set(['field', 'next', 'hands', 'version']) <= set(update)
+
+
+def test_join_and_leave(table):
+    viewer = Viewer()
+    with pytest.raises(ValueError):
+        table.join(viewer, 4)
+
+    table.join(viewer, 1)
+    table.leave(viewer)
+    assert [] == table.viewers()
+    with pytest.raises(ValueError):
+        table.leave(viewer)
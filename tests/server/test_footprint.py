@@ -0,0 +1,30 @@
+import sys
+
+import pytest
+
+from lohai.game.deck import Deck
+from lohai.server.footprint import (footprint_report, game_footprint, main,
+                                    object_footprint, sample_rounds)
+
+
+def test_shared_cards_are_not_counted():
+    deck = Deck.shuffle_new_deck()
+    assert sys.getsizeof(deck.cards) == object_footprint(deck.cards)
+
+
+def test_footprint_report():
+    rounds = sample_rounds(20)
+    report = footprint_report(rounds)
+
+    assert 20 == report['games']
+    assert 0 < report['snapshot_bytes_per_game']
+    # a round in play fits in a few KB
+    assert 0 < report['live_bytes_per_game'] < 4096
+    assert game_footprint(rounds[0]) > object_footprint(rounds[0].hands)
+
+
+def test_footprint_of_no_games():
+    assert {'games': 0, 'live_bytes_per_game': 0,
+            'snapshot_bytes_per_game': 0} == footprint_report([])
+    with pytest.raises(SystemExit):
+        main(['--games', '0'])
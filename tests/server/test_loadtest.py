@@ -0,0 +1,37 @@
+import json
+
+from lohai.server import loadtest
+
+
+def test_percentiles():
+    stats = loadtest.percentiles(range(1, 101))
+    assert {'count': 100, 'p50': 50, 'p90': 90, 'p99': 99,
+            'max': 100} == stats
+    assert {'count': 0} == loadtest.percentiles([])
+
+
+def test_profiles():
+    assert [(2.0, 3), (2.0, 6), (2.0, 10)] == loadtest.ramp_profile(10, 3, 6)
+    assert [(5.0, 4)] == loadtest.soak_profile(4, 5)
+
+
+def test_run_load():
+    report = loadtest.run_load([(0.3, 2), (0.3, 4), (0.3, 1)], think=0.001,
+                               workers=2, sample_interval=0.1)
+
+    assert {} == report['errors']
+    assert 16 == report['players']
+    assert report['latency']['play_card']['count'] > 0
+    assert report['actions'] == sum(stats['count'] for stats
+                                    in report['latency'].values())
+    assert report['delivery_lag']['count'] >= report['actions']
+    assert len(report['rss_samples']) > 1
+
+
+def test_main_json(capsys):
+    loadtest.main(['--profile', 'ramp', '--tables', '2', '--steps', '2',
+                   '--duration', '0.4', '--think', '0', '--workers', '1',
+                   '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert report['actions'] > 0
+    assert {} == report['errors']
@@ -0,0 +1,201 @@
+# pylint: disable=R0201,W0621
+
+import multiprocessing
+
+import pytest
+
+import lohai.events
+from lohai import exception
+from lohai.events import Events
+from lohai.game.deck import Card, CardValue, Deck, SpecialCard, Suit
+from lohai.game.round import Round
+from lohai.server.shard import ShardDispatcher, ShardWorker, shard_for_game
+
+
+def _first_suited_card(round, player):
+    return [card for card in round.get_hand_for_player(player)
+            if not card.is_special][0]
+
+
+@pytest.fixture()
+def dispatcher():
+    with ShardDispatcher(worker_count=3) as dispatcher:
+        yield dispatcher
+
+
+def test_shard_for_game_is_stable():
+    shards = [0, 1, 2, 3]
+    owners = dict((game_id, shard_for_game(game_id, shards))
+                  for game_id in range(200))
+
+    assert set(owners.values()) == set(shards)
+    assert owners == dict((game_id, shard_for_game(game_id, shards))
+                          for game_id in range(200))
+
+
+def test_removing_shard_only_moves_its_games():
+    shards = [0, 1, 2, 3]
+    for game_id in range(200):
+        owner = shard_for_game(game_id, shards)
+        remaining = [shard for shard in shards if shard != 2]
+        if owner != 2:
+            assert owner == shard_for_game(game_id, remaining)
+
+
+def test_act_routes_to_owner(dispatcher):
+    dispatcher.new_game('game-1')
+    round = dispatcher.snapshot('game-1')
+    card = _first_suited_card(round, 0)
+
+    dispatcher.act('game-1', 'play_card', 0, card)
+
+    round = dispatcher.snapshot('game-1')
+    assert card == round.this_rounds_cards[0]
+    assert card not in round.get_hand_for_player(0)
+
+
+def test_act_raises_game_errors(dispatcher):
+    dispatcher.new_game('game-1')
+    round = dispatcher.snapshot('game-1')
+
+    with pytest.raises(exception.NotYourTurn):
+        dispatcher.act('game-1', 'play_card', 1, _first_suited_card(round, 1))
+
+    with pytest.raises(AttributeError):
+        dispatcher.act('game-1', 'start_new_round')
+
+
+def test_act_many(dispatcher):
+    game_ids = ['game-%d' % i for i in range(10)]
+    requests = []
+    for game_id in game_ids:
+        dispatcher.new_game(game_id)
+        round = dispatcher.snapshot(game_id)
+        requests.append((game_id, 'play_card',
+                         (0, _first_suited_card(round, 0))))
+
+    requests.append(('game-0', 'play_card', (3, None)))
+    results = dispatcher.act_many(requests)
+
+    assert [None] * 10 == results[:10]
+    assert isinstance(results[10], exception.NotYourTurn)
+    for game_id, _action, (_player, card) in requests[:10]:
+        assert card == dispatcher.snapshot(game_id).this_rounds_cards[0]
+
+
+def test_drain_worker_migrates_games(dispatcher):
+    game_ids = ['game-%d' % i for i in range(20)]
+    for game_id in game_ids:
+        dispatcher.new_game(game_id)
+    before = dict((game_id, dispatcher.snapshot(game_id).hands)
+                  for game_id in game_ids)
+
+    drained = dispatcher.shard_for_game('game-0')
+    dispatcher.drain_worker(drained)
+
+    assert drained not in dispatcher.shards
+    assert sorted(game_ids) == sorted(dispatcher.game_ids())
+    for game_id in game_ids:
+        assert before[game_id] == dispatcher.snapshot(game_id).hands
+
+
+def test_drain_last_worker_refused():
+    with ShardDispatcher(worker_count=1) as dispatcher:
+        dispatcher.new_game('game-1')
+
+        with pytest.raises(ValueError):
+            dispatcher.drain_worker(dispatcher.shards[0])
+
+        assert ['game-1'] == dispatcher.game_ids()
+
+
+def test_drain_worker_keeps_games_on_failed_import(dispatcher):
+    game_ids = ['game-%d' % i for i in range(20)]
+    for game_id in game_ids:
+        dispatcher.new_game(game_id)
+    drained = dispatcher.shard_for_game('game-0')
+    # a game that is already present makes the import onto its owner fail
+    moved = [game_id for game_id in game_ids
+             if dispatcher.shard_for_game(game_id) == drained][-1]
+    others = [shard for shard in dispatcher.shards if shard != drained]
+    new_owner = shard_for_game(moved, others)
+    dispatcher._workers[new_owner].call(  # pylint: disable=W0212
+        'import_games', {moved: dispatcher._workers[drained].call(
+            'snapshot', moved)})
+
+    with pytest.raises(KeyError):
+        dispatcher.drain_worker(drained)
+
+    assert drained in dispatcher.shards
+    assert sorted(game_ids + [moved]) == sorted(dispatcher.game_ids())
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason="needs fork to inherit the patched worker")
+def test_act_many_reads_every_reply(monkeypatch):
+    def op_act_many(self, requests):
+        if requests[0][0] == 'game-0':
+            raise RuntimeError("worker failure")
+        return original(self, requests)
+
+    original = ShardWorker.op_act_many
+    monkeypatch.setattr(ShardWorker, 'op_act_many', op_act_many)
+
+    # the workers only see the patch if they are forked after it, whatever
+    # the platform's default start method
+    with ShardDispatcher(worker_count=3,
+                         context=multiprocessing.get_context('fork')) \
+            as dispatcher:
+        game_ids = ['game-%d' % i for i in range(10)]
+        requests = []
+        for game_id in game_ids:
+            dispatcher.new_game(game_id)
+            round = dispatcher.snapshot(game_id)
+            requests.append((game_id, 'play_card',
+                             (0, _first_suited_card(round, 0))))
+
+        with pytest.raises(RuntimeError):
+            dispatcher.act_many(requests)
+
+        # every pipe is back in step
+        for game_id in game_ids:
+            assert game_id == dispatcher.snapshot(game_id).game_id
+
+
+def test_add_worker_rebalances(dispatcher):
+    game_ids = ['game-%d' % i for i in range(50)]
+    for game_id in game_ids:
+        dispatcher.new_game(game_id)
+
+    shard = dispatcher.add_worker()
+
+    assert sorted(game_ids) == sorted(dispatcher.game_ids())
+    owned = [game_id for game_id in game_ids
+             if dispatcher.shard_for_game(game_id) == shard]
+    assert owned
+    for game_id in owned:
+        assert game_id == dispatcher.snapshot(game_id).game_id
+
+
+def test_worker_events_are_forwarded(dispatcher):
+    received = []
+
+    def handler(game_id, player_id, event_type):
+        received.append((game_id, player_id, event_type))
+
+    hands = [[SpecialCard(CardValue.mover)],
+             [Card(CardValue.two, Suit.club)],
+             [Card(CardValue.three, Suit.club)],
+             [Card(CardValue.four, Suit.club)]]
+    round = Round(Deck([Card(CardValue.five, Suit.club)]), hands,
+                  Card(CardValue.king, Suit.heart))
+    round.tricks_won = [1, 0, 2, 0]
+    dispatcher.new_game('game-1', round)
+
+    lohai.events.add_handler(handler)
+    try:
+        dispatcher.act('game-1', 'play_card', 0, SpecialCard(CardValue.mover))
+    finally:
+        lohai.events.remove_handler(handler)
+
+    assert [('game-1', 0, Events.mover_input_needed)] == received
@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from lohai.game.notation import format_card, format_cards
+from lohai.game.round import Round
+from lohai.game.simulate import legal_moves
+from lohai.server.fanout import SPECTATOR, public_state
+from lohai.server.views import ViewCache
+
+
+@pytest.fixture()
+def views():
+    views = ViewCache()
+    views.add_game('game-1', Round.start_new_round(random.Random(8)))
+    return views
+
+
+def _expected(round, viewer):
+    expected = {'table': public_state(round),
+                'trump': format_card(round.trump_card)}
+    if viewer != SPECTATOR:
+        expected['hand'] = format_cards(round.hands[viewer])
+    return expected
+
+
+def test_views_follow_play(views):
+    round = views._games['game-1'].round  # pylint: disable=W0212
+    rng = random.Random(2)
+    for _i in range(30):
+        for viewer in [SPECTATOR, 0, 1, 2, 3]:
+            view = views.view('game-1', viewer)
+            assert _expected(round, viewer) == json.loads(
+                view.decode('utf-8'))
+        views.act('game-1', *rng.choice(legal_moves(round)))
+
+
+def test_unchanged_views_are_cached(views):
+    view = views.view('game-1', 2)
+    assert view is views.view('game-1', 2)
+    assert (1, 1) == (views.hits, views.misses)
+
+
+def test_play_only_rebuilds_the_players_hand(views):
+    game = views._games['game-1']  # pylint: disable=W0212
+    for viewer in range(4):
+        views.view('game-1', viewer)
+    hands = list(game.hands)
+
+    move = legal_moves(game.round)[0]
+    views.act('game-1', *move)
+
+    assert game.hands[move[1]] is None
+    assert all(game.hands[seat] is hands[seat]
+               for seat in range(4) if seat != move[1])
+    assert {} == game.views
+
+
+def test_invalidate_after_outside_change(views):
+    game = views._games['game-1']  # pylint: disable=W0212
+    before = views.view('game-1', 0)
+    game.round.hands[0].pop()
+    assert before is views.view('game-1', 0)
+
+    views.invalidate('game-1', table=True, seats=[0])
+    assert before != views.view('game-1', 0)
+
+
+def test_unknown_viewer_and_game(views):
+    with pytest.raises(ValueError):
+        views.view('game-1', 4)
+    with pytest.raises(KeyError):
+        views.add_game('game-1', Round.start_new_round())
+    views.remove_game('game-1')
+    with pytest.raises(KeyError):
+        views.view('game-1')
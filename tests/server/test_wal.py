@@ -0,0 +1,150 @@
+import os
+import threading
+
+import pytest
+
+from lohai.game.deck import Card, CardValue, Suit
+from lohai.game.round import Round
+from lohai.game.simulate import legal_moves
+from lohai.server.wal import RecoveryError, WriteAheadLog, read_log, recover
+
+
+@pytest.fixture()
+def log_path(tmpdir):
+    return str(tmpdir.join('games.wal'))
+
+
+class CountingSync(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, fd):
+        self.calls += 1
+        os.fsync(fd)
+
+
+def _first_trick(round):
+    # the lowest legal card of each seat in turn
+    moves = []
+    for player in range(4):
+        hand = round.current_hand
+        cards = sorted(round.hands[player])
+        suited = [card for card in cards if card.suit == hand.lead_suit]
+        card = (suited or cards)[0]
+        move = ('play_card', player, card)
+        round.apply_moves([move])
+        moves.append(move)
+    return moves
+
+
+def test_recover_replays_moves(log_path):
+    round = Round.start_new_round()
+    with WriteAheadLog(log_path) as log:
+        log.log_new_game('game-1', round).wait()
+        for move in _first_trick(round):
+            log.log_move('game-1', move)
+
+    recovered = recover(log_path)
+    assert ['game-1'] == list(recovered)
+    assert round.tricks_won == recovered['game-1'].tricks_won
+    assert round.hands == recovered['game-1'].hands
+
+
+def test_group_commit(log_path):
+    sync = CountingSync()
+    log = WriteAheadLog(log_path, max_delay=0.05, fsync=sync)
+    commits = []
+
+    def append(game):
+        commits.append(log.log_move('game-%d' % game,
+                                    ('play_card', 0,
+                                     Card(CardValue.two, Suit.club))))
+
+    threads = [threading.Thread(target=append, args=(game,))
+               for game in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for commit in commits:
+        assert commit.wait(5)
+        assert commit.durable
+    log.close()
+
+    assert 50 == log.records
+    assert sync.calls == log.batches < 50
+    assert 50 == len(read_log(log_path))
+
+
+def test_failed_write_is_reported(log_path):
+    def failing_sync(_fd):
+        raise OSError("disk gone")
+
+    log = WriteAheadLog(log_path, fsync=failing_sync)
+    commit = log.log_move('game-1', ('handle_giver', 3, 1))
+    with pytest.raises(OSError):
+        commit.wait(5)
+    assert not commit.durable
+    log.close()
+
+
+def test_torn_tail_is_cut(log_path):
+    with WriteAheadLog(log_path) as log:
+        log.log_move('game-1', ('handle_giver', 3, 1))
+        log.log_move('game-1', ('handle_giver', 3, 2))
+
+    with open(log_path, 'ab') as raw:
+        raw.write(b'\x00\x00\x01\x00torn')
+    assert 2 == len(read_log(log_path))
+
+    with WriteAheadLog(log_path) as log:
+        log.log_move('game-1', ('handle_giver', 3, 0))
+
+    assert [('move', 'game-1', ('handle_giver', 3, 1)),
+            ('move', 'game-1', ('handle_giver', 3, 2)),
+            ('move', 'game-1', ('handle_giver', 3, 0))] == read_log(log_path)
+
+
+def test_checkpoint(log_path):
+    round = Round.start_new_round()
+    with WriteAheadLog(log_path) as log:
+        log.log_new_game('game-1', round)
+        moves = _first_trick(round)
+        for move in moves[:2]:
+            log.log_move('game-1', move)
+        log.checkpoint({'game-1': round})
+        move = legal_moves(round)[0]
+        round.apply_moves([move])
+        log.log_move('game-1', move).wait()
+
+    records = read_log(log_path)
+    assert ['new', 'move'] == [record[0] for record in records]
+    assert round.hands == recover(log_path)['game-1'].hands
+
+
+def test_recovery_fails_games_that_diverge(log_path):
+    round = Round.start_new_round()
+    other = Round.start_new_round()
+    with WriteAheadLog(log_path) as log:
+        log.log_new_game('game-1', round)
+        log.log_new_game('game-2', other)
+        log.log_move('game-1', ('handle_giver', 0, 1))
+        log.log_move('game-1', _first_trick(round)[0])
+        log.log_move('game-3', ('handle_giver', 0, 1)).wait()
+
+    with pytest.raises(RecoveryError) as error:
+        recover(log_path)
+
+    assert ['game-2'] == list(error.value.games)
+    assert other.hands == error.value.games['game-2'].hands
+    assert [('game-1', 2), ('game-3', 4)] == sorted(
+        (game_id, index) for game_id, (index, _move, _reason)
+        in error.value.failures.items())
+    assert 'game-1 at record 2' in str(error.value)
+
+
+def test_append_after_close(log_path):
+    log = WriteAheadLog(log_path)
+    log.close()
+    with pytest.raises(ValueError):
+        log.log_move('game-1', ('handle_giver', 3, 1))
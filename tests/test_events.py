@@ -0,0 +1,136 @@
+import gc
+
+import pytest
+
+import lohai.events
+from lohai.events import Event, Events, Subscriptions, event_notify
+
+
+@pytest.fixture()
+def received():
+    return []
+
+
+def test_event_notify_and_collect():
+    counts = [0, 0]
+
+    def inc_first():
+        counts[0] += 1
+
+    def inc_second():
+        counts[1] += 1
+
+    first = Event('first')
+    second = Event('second')
+    first.register(inc_first)
+    second.register(inc_second)
+
+    first.notify()
+    assert [1, 0] == counts
+    second.notify()
+    assert [1, 1] == counts
+
+    del inc_first, inc_second
+    gc.collect()
+
+    first.notify()
+    second.notify()
+    assert [1, 1] == counts
+    assert [] == first.callbacks
+    assert [] == second.callbacks
+
+
+def test_bound_methods_are_held_weakly():
+    class Spectator(object):
+        def __init__(self):
+            self.seen = []
+
+        def on_event(self, *args):
+            self.seen.append(args)
+
+    event = Event('test')
+    spectator = Spectator()
+    event.register(spectator.on_event)
+
+    event.notify(1)
+    assert [(1,)] == spectator.seen
+
+    del spectator
+    gc.collect()
+    assert [] == event.callbacks
+
+
+def test_unregister():
+    def callback():
+        pass
+
+    event = Event('test')
+    event.register(callback)
+    assert event.unregister(callback)
+    assert not event.unregister(callback)
+    assert [] == event.callbacks
+
+
+def test_dispatch_by_type(received):
+    def on_giver(*args):
+        received.append(args)
+
+    lohai.events.subscribe(on_giver, [Events.giver_input_needed])
+    try:
+        event_notify('game', 0, Events.mover_input_needed)
+        event_notify('game', 1, Events.giver_input_needed)
+    finally:
+        lohai.events.unsubscribe(on_giver)
+
+    event_notify('game', 2, Events.giver_input_needed)
+    assert [('game', 1, Events.giver_input_needed)] == received
+
+
+def test_subscriptions_close_together(received):
+    with Subscriptions([(lambda *args: received.append(('a',) + args),
+                         [Events.shaker_input_needed]),
+                        (lambda *args: received.append(('b',) + args),
+                         None)]):
+        event_notify('game', 0, Events.shaker_input_needed)
+        event_notify('game', 1, Events.hand_complete)
+
+    event_notify('game', 2, Events.shaker_input_needed)
+    assert [('a', 'game', 0, Events.shaker_input_needed),
+            ('b', 'game', 0, Events.shaker_input_needed),
+            ('b', 'game', 1, Events.hand_complete)] == received
+
+
+def test_notifications_are_logged(caplog):
+    with caplog.at_level('DEBUG', logger='lohai.events'):
+        event_notify('game', 3, Events.hand_complete)
+    assert 'Notification for Game game, Player 3' in caplog.text
+
+
+def test_add_handler_holds_lambdas(received):
+    lohai.events.add_handler(lambda *args: received.append(args))
+    gc.collect()
+    event_notify('game', 0, Events.hand_complete)
+    assert [('game', 0, Events.hand_complete)] == received
+
+    # the lambda can't be named again, drop it through the list
+    lohai.events.remove_handler(lohai.events._handlers[-1])  # pylint: disable=W0212
+    event_notify('game', 1, Events.hand_complete)
+    assert 1 == len(received)
+
+
+def test_builtin_methods_are_held(received):
+    event = Event('test')
+    event.register(received.append)
+    gc.collect()
+    event.notify('first')
+    assert event.unregister(received.append)
+    event.notify('second')
+    assert ['first'] == received
+
+
+def test_add_handler_builtin_method(received):
+    lohai.events.add_handler(received.append)
+    assert received.append in lohai.events._handlers  # pylint: disable=W0212
+    lohai.events.remove_handler(received.append)
+    event_notify('game', 0, Events.hand_complete)
+    assert [] == received
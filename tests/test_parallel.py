@@ -0,0 +1,20 @@
+from lohai.parallel import run_chunks
+
+
+def test_results_in_order():
+    results = []
+    run_chunks(pow, ((2, power) for power in range(6)), results.append,
+               processes=2)
+    assert [1, 2, 4, 8, 16, 32] == results
+
+
+def test_stop_early():
+    results = []
+
+    def collect(result):
+        results.append(result)
+        return result >= 4
+
+    run_chunks(pow, ((2, power) for power in range(100)), collect,
+               processes=2)
+    assert [1, 2, 4] == results
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+import lohai
+
+
+# seconds to import the game engine in a fresh interpreter, best of three
+IMPORT_BUDGET = 0.2
+
+WORKER_MODULES = ['lohai.game.round', 'lohai.game.simulate',
+                  'lohai.analysis.stats', 'lohai.analysis.tournament',
+                  'lohai.analysis.export']
+
+# only imported when their feature is used
+LAZY_MODULES = ['logging', 'multiprocessing', 'numpy']
+
+_PROBE = """
+import json, sys, time
+started = time.time()
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({'seconds': time.time() - started,
+                  'modules': sorted(sys.modules)}))
+"""
+
+
+def _import(*modules):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(lohai.__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [path for path in [env.get('PYTHONPATH')] if path])
+    output = subprocess.check_output(
+        [sys.executable, '-c', _PROBE] + list(modules), env=env)
+    return json.loads(output.decode('utf-8'))
+
+
+def test_import_budget():
+    seconds = min(_import('lohai.game.round')['seconds'] for _i in range(3))
+    assert seconds < IMPORT_BUDGET
+
+
+def test_workers_skip_optional_modules():
+    loaded = set(_import(*WORKER_MODULES)['modules'])
+    assert [] == [name for name in LAZY_MODULES if name in loaded]